@@ -0,0 +1,177 @@
+import argparse
+import json
+import os
+import random
+import resource
+import time
+import multiprocessing
+from drone_world.drone_world import DroneWorld
+from drone_world.drone_world_goal import TowerPlannerTabu, TowerPlannerSimulateAnnealing, TowerPlannerAStar, \
+    TowerPlannerHierarchical, TowerPlannerJumpPoint
+from drone_world.cooperative_planner import CooperativeTowerPlanner
+from generate_random_world import DroneWorldWriter, generate_world
+
+WORLDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worlds")
+
+# Planners that can be benchmarked by name
+PLANNERS = {
+    "tabu": TowerPlannerTabu,
+    "annealing": TowerPlannerSimulateAnnealing,
+    "astar": TowerPlannerAStar,
+    "hierarchical": TowerPlannerHierarchical,
+    "jump_point": TowerPlannerJumpPoint,
+    "cooperative": CooperativeTowerPlanner,
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the tower planners across drone worlds.")
+    parser.add_argument("--worlds", type=str, nargs="*", help="World files (default: every world in {})".format(WORLDS_DIR),
+                        required=False)
+    parser.add_argument("--generated", type=int, nargs="*", help="Block counts of generated worlds to add to the sweep",
+                        default=[], required=False)
+    parser.add_argument("--planners", type=str, nargs="+", help="Planners to benchmark", choices=sorted(PLANNERS),
+                        default=sorted(PLANNERS), required=False)
+    parser.add_argument("--seeds", type=int, nargs="+", help="RNG seeds", default=[0, 1, 2], required=False)
+    parser.add_argument("--heights", type=int, nargs="+", help="Tower heights", default=[1, 5], required=False)
+    parser.add_argument("--timeout", type=float, help="Seconds before a run is stopped and counted as failed",
+                        default=60.0, required=False)
+    parser.add_argument("--search-deadline", type=float, help="Seconds before a single search returns its best partial path",
+                        required=False)
+    parser.add_argument("--max-expansions", type=int, help="Nodes a single search can expand before it returns its best "
+                        "partial path", required=False)
+    parser.add_argument("--output", type=str, help="Results filename", default="benchmark_results.json",
+                        required=False)
+    parser.add_argument("--baseline", type=str, help="Baseline results filename to compare against", required=False)
+    parser.add_argument("--tolerance", type=float, help="Allowed relative wall time increase over the baseline",
+                        default=0.25, required=False)
+
+    return parser.parse_args()
+
+def load_world(world, seed):
+    """Load a world file (CSV or binary snapshot) or generate a world for a "generated:<blocks>" name.
+    """
+    if world.startswith("generated:"):
+        blocks = int(world.split(":")[1])
+        args = argparse.Namespace(red_blocks=blocks - 3 * (blocks // 4), blue_blocks=blocks // 4,
+                                  green_blocks=blocks // 4, yellow_blocks=blocks // 4, wall_count=0,
+                                  x_min=-50, x_max=50, y_max=50, z_min=-50, z_max=50, seed=seed)
+        drone_world = DroneWorld()
+        generate_world(DroneWorldWriter(drone_world), args, blocks)
+        return drone_world
+    if world.endswith(".csv"):
+        drone_world = DroneWorld()
+        drone_world.initialize(world)
+        return drone_world
+    return DroneWorld.load(world)
+
+def run_case(case, queue):
+    """Run a single benchmark case in its own process so the peak memory is the run's own.
+    """
+    start_time = time.time()
+    world = load_world(case["world"], case["seed"])
+    load_time = time.time() - start_time
+
+    random.seed(case["seed"])
+    planner = PLANNERS[case["planner"]](0, case["height"], 0, world, deadline=case["search_deadline"],
+                                        max_expansions=case["max_expansions"])
+    error = None
+    start_time = time.time()
+    try:
+        planner.run()
+    except RuntimeError as e:
+        error = str(e)
+    queue.put({
+        "load_time": load_time,
+        "wall_time": time.time() - start_time,
+        "moves": planner.moves,
+        "time_steps": getattr(planner, "time_steps", planner.moves),
+        "nodes_expanded": planner.iterations,
+        "partial_searches": planner.partial_searches,
+        "peak_memory_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "success": error is None,
+        "error": error,
+    })
+
+def benchmark(case, timeout):
+    """Run a benchmark case, stopping it after timeout seconds.
+    """
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=run_case, args=(case, queue))
+    process.start()
+    process.join(timeout)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+        result = {"wall_time": timeout, "success": False, "error": "Timeout after {} seconds".format(timeout)}
+    elif process.exitcode != 0:
+        result = {"success": False, "error": "Exit code {}".format(process.exitcode)}
+    else:
+        result = queue.get()
+    result.update(case)
+    return result
+
+def case_key(result):
+    return result["world"], result["planner"], result["seed"], result["height"]
+
+def compare(results, baseline, tolerance):
+    """Return a list of regression descriptions of results against baseline results.
+    Small wall times are ignored as noise.
+    """
+    baseline_results = dict((case_key(result), result) for result in baseline)
+    regressions = []
+    for result in results:
+        base = baseline_results.get(case_key(result))
+        if not base or not base["success"]:
+            continue
+        name = "{} {} seed={} height={}".format(*case_key(result))
+        if not result["success"]:
+            regressions.append("{}: failed ({})".format(name, result["error"]))
+            continue
+        if result["wall_time"] > base["wall_time"] * (1.0 + tolerance) and result["wall_time"] - base["wall_time"] > 0.05:
+            regressions.append("{}: wall time {:.3f}s > {:.3f}s".format(name, result["wall_time"], base["wall_time"]))
+        if result["moves"] > base["moves"]:
+            regressions.append("{}: moves {} > {}".format(name, result["moves"], base["moves"]))
+    return regressions
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    worlds = args.worlds
+    if worlds is None:
+        worlds = [os.path.join(WORLDS_DIR, name) for name in sorted(os.listdir(WORLDS_DIR))]
+    worlds += ["generated:{}".format(blocks) for blocks in args.generated]
+
+    results = []
+    print "{:<50} {:<10} {:>5} {:>6} {:>9} {:>7} {:>9} {:>10}".format("world", "planner", "seed", "height", "time (s)",
+                                                                       "moves", "expanded", "memory (kB)")
+    for world in worlds:
+        for planner in args.planners:
+            for seed in args.seeds:
+                for height in args.heights:
+                    case = {"world": os.path.basename(world) if os.path.dirname(world) == WORLDS_DIR else world,
+                            "planner": planner, "seed": seed, "height": height}
+                    result = benchmark(dict(case, world=world, search_deadline=args.search_deadline,
+                                            max_expansions=args.max_expansions), args.timeout)
+                    result.update(case)
+                    results.append(result)
+                    if result["success"]:
+                        print "{:<50} {:<10} {:>5} {:>6} {:>9.3f} {:>7} {:>9} {:>10}".format(
+                            case["world"], planner, seed, height, result["wall_time"], result["moves"],
+                            result["nodes_expanded"], result["peak_memory_kb"])
+                    else:
+                        print "{:<50} {:<10} {:>5} {:>6} {}".format(case["world"], planner, seed, height, result["error"])
+
+    with open(args.output, "w") as results_file:
+        json.dump({"created": time.time(), "results": results}, results_file, indent=2, sort_keys=True)
+    print "Benchmark results filename: {}".format(args.output)
+
+    if args.baseline:
+        with open(args.baseline, "r") as baseline_file:
+            regressions = compare(results, json.load(baseline_file)["results"], args.tolerance)
+        for regression in regressions:
+            print "Regression: {}".format(regression)
+        if regressions:
+            exit(1)
+        print "No regressions against {}".format(args.baseline)
+
+    exit(0)
@@ -1,8 +1,21 @@
+import argparse
+import copy
 from drone_world.drone_world_figure import DroneWorldFigure
+from drone_world.drone_world_animation import DroneWorldAnimation
 from drone_world.drone_world import DroneWorld
 from drone_world.drone_world_goal import TowerPlannerSimulateAnnealing
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build a tower and display the world before and after.")
+    parser.add_argument("--animate", action="store_true", help="Play back the tower build before the end world")
+    parser.add_argument("--save-animation", type=str, metavar="FILE",
+                        help="Write the playback of the tower build to a GIF or video file", required=False)
+
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
+
     # Initialize the world
     world = DroneWorld()
     world.initialize("worlds/10_walls_10_red_10_blue_15_green_15_yellow.csv")
@@ -12,12 +25,20 @@ if __name__ == "__main__":
 
     # Set the goal position to be the first read block that is not covered
     tower = TowerPlannerSimulateAnnealing(0, 5, 0, world)
+    start_world = copy.deepcopy(world) if args.animate or args.save_animation else None
     tower.run()
 
     # Display stats
     print "Number of moves: {}".format(tower.moves)
     print "Runtime: {}".format(tower.runtime)
 
+    # Play back the tower build
+    if args.save_animation:
+        DroneWorldAnimation(start_world, [tower.log], headless=True).save(args.save_animation)
+        print "Animation filename: {}".format(args.save_animation)
+    if args.animate:
+        DroneWorldAnimation(start_world, [tower.log]).play()
+
     # Display end world
     DroneWorldFigure(world).show()
 
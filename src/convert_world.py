@@ -0,0 +1,24 @@
+import argparse
+from drone_world.drone_world import DroneWorld
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Convert a drone world configuration file to a binary snapshot.")
+    parser.add_argument("--input", type=str, help="Configuration filename", required=True)
+    parser.add_argument("--output", type=str, help="Binary snapshot filename", required=True)
+    parser.add_argument("--x_min", type=int, help="X-min value of drone world", default=-50, required=False)
+    parser.add_argument("--x_max", type=int, help="X-max value of drone world", default=50, required=False)
+    parser.add_argument("--y_max", type=int, help="Y-max value of drone world", default=50, required=False)
+    parser.add_argument("--z_min", type=int, help="Z-min value of drone world", default=-50, required=False)
+    parser.add_argument("--z_max", type=int, help="Z-max value of drone world", default=50, required=False)
+
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    world = DroneWorld(x_min=args.x_min, x_max=args.x_max, y_max=args.y_max, z_min=args.z_min, z_max=args.z_max)
+    world.initialize(args.input)
+    world.save(args.output)
+
+    print "Drone world snapshot filename: {}".format(args.output)
+    exit(0)
\ No newline at end of file
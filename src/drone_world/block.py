@@ -1,4 +1,5 @@
 from drone_world_object import DroneWorldObject
+from instrumentation import Instrumentation
 
 class Block(DroneWorldObject):
     def __init__(self, world, x, y, z, object_id):
@@ -8,5 +9,9 @@ class Block(DroneWorldObject):
     def drop(self):
         """Move the block to the lowest y position holding x and z.
         """
-        while self.move(0, -1, 0):
-            continue
\ No newline at end of file
+        drop_y = self._world.get_drop_height(self.x, self.y, self.z)
+        if Instrumentation.enabled:
+            Instrumentation.count("Block.drop")
+            Instrumentation.count("Block.drop.cells", self.y - drop_y)
+        if drop_y != self.y:
+            self.move(0, drop_y - self.y, 0)
\ No newline at end of file
@@ -0,0 +1,296 @@
+import heapq
+import itertools
+from collections import deque
+from instrumentation import Instrumentation
+from search.search_status import SearchStatus
+
+class ChunkGraph(object):
+    # Unit step along each axis
+    AXES = [(1, 0, 0), (0, 1, 0), (0, 0, 1)]
+
+    def __init__(self, world, size=8, carrying=False):
+        """Abstract graph of a drone world split into size x size x size chunks (HPA*).
+         Adjacent chunks are connected by one transition for every connected region of free
+         locations on their shared face, and the transitions of a chunk are connected by their
+         distances inside the chunk. The transitions are computed the first time a search reaches
+         a chunk and the distances from a transition the first time a search expands it, and both
+         are computed again after an obstacle of the chunk changes. If carrying is set, a location
+         is free only if both the drone and the block below it fit. iterations counts the
+         transitions and locations expanded by find_path(), not the searches that compute the
+         chunks.
+        """
+        if size <= 0:
+            raise ValueError("Chunk size must be greater than zero")
+        self.world = world
+        self.size = size
+        self.carrying = carrying
+        self.iterations = 0
+
+        # Map of (chunk, axis) to the (location, neighbor location) transitions from the chunk to the
+        # next chunk along the axis
+        self._faces = {}
+
+        # Map of chunks to the map of each transition location of the chunk to its (location, cost)
+        # edges to the next chunks and its edges inside the chunk (None until they are needed)
+        self._edges = {}
+
+        # World version the graph is up to date with, later obstacle changes are read from the world
+        self._version = world.version
+        world.track_obstacle_changes(self)
+
+    def is_free(self, x, y, z):
+        if self.carrying:
+            return self.world.can_move_drone(x, y, z) and self.world.can_move_drone(x, y - 1, z)
+        return self.world.can_move_drone(x, y, z)
+
+    def chunk(self, location):
+        """Get the (i, j, k) index of the chunk holding the (x, y, z) location.
+        """
+        x, y, z = location
+        return ((x - self.world.x_min) // self.size, (y - self.world.y_min) // self.size,
+                (z - self.world.z_min) // self.size)
+
+    def _bounds(self, chunk):
+        """Get the lowest and highest (x, y, z) locations of a chunk.
+        """
+        world = self.world
+        low = (world.x_min + chunk[0] * self.size, world.y_min + chunk[1] * self.size,
+               world.z_min + chunk[2] * self.size)
+        high = (min(low[0] + self.size - 1, world.x_max), min(low[1] + self.size - 1, world.y_max),
+                min(low[2] + self.size - 1, world.z_max))
+        return low, high
+
+    def _sync(self):
+        """Drop the transitions and edges around the chunks with obstacle changes.
+        """
+        if self._version == self.world.version:
+            return
+        dirty = set()
+        for x, y, z in self.world.get_obstacle_changes(self):
+            dirty.add(self.chunk((x, y, z)))
+            if self.carrying:
+                # The location is the block location of the drone location above it
+                dirty.add(self.chunk((x, y + 1, z)))
+        for chunk in dirty:
+            if Instrumentation.enabled:
+                Instrumentation.count("ChunkGraph.invalidate")
+            self._edges.pop(chunk, None)
+            for axis, (dx, dy, dz) in enumerate(ChunkGraph.AXES):
+                previous = chunk[0] - dx, chunk[1] - dy, chunk[2] - dz
+                following = chunk[0] + dx, chunk[1] + dy, chunk[2] + dz
+                self._faces.pop((chunk, axis), None)
+                self._faces.pop((previous, axis), None)
+                self._edges.pop(previous, None)
+                self._edges.pop(following, None)
+        self._version = self.world.version
+
+    def _face(self, chunk, axis):
+        """Get the transitions from chunk to the next chunk along axis.
+        """
+        key = chunk, axis
+        if key in self._faces:
+            return self._faces[key]
+        low, high = self._bounds(chunk)
+        dx, dy, dz = ChunkGraph.AXES[axis]
+        world_high = self.world.x_max, self.world.y_max, self.world.z_max
+        transitions = []
+        if high[axis] < world_high[axis] and high[axis] == low[axis] + self.size - 1:
+            # Free location pairs across the face, indexed by the two other axes
+            u_axis, v_axis = [other for other in range(3) if other != axis]
+            free = set()
+            for u in range(low[u_axis], high[u_axis] + 1):
+                for v in range(low[v_axis], high[v_axis] + 1):
+                    location = [0, 0, 0]
+                    location[axis], location[u_axis], location[v_axis] = high[axis], u, v
+                    x, y, z = location
+                    if self.is_free(x, y, z) and self.is_free(x + dx, y + dy, z + dz):
+                        free.add((u, v))
+
+            # One transition in the middle of each connected region of the face
+            while free:
+                start = free.pop()
+                region = [start]
+                queue = deque([start])
+                while queue:
+                    u, v = queue.popleft()
+                    for neighbor in ((u + 1, v), (u - 1, v), (u, v + 1), (u, v - 1)):
+                        if neighbor in free:
+                            free.remove(neighbor)
+                            region.append(neighbor)
+                            queue.append(neighbor)
+                region.sort()
+                u, v = region[len(region) // 2]
+                location = [0, 0, 0]
+                location[axis], location[u_axis], location[v_axis] = high[axis], u, v
+                x, y, z = location
+                transitions.append(((x, y, z), (x + dx, y + dy, z + dz)))
+        self._faces[key] = transitions
+        return transitions
+
+    def _bfs(self, start, chunk, targets=None):
+        """Breadth first search from start inside chunk.
+        Return the map of reached locations to their distance from start, stopping once every
+        location of targets is reached if set.
+        """
+        (low_x, low_y, low_z), (high_x, high_y, high_z) = self._bounds(chunk)
+        distances = {start: 0}
+        left = None if targets is None else len(set(targets) - set([start]))
+        queue = deque([start])
+        while queue and left != 0:
+            location = queue.popleft()
+            distance = distances[location] + 1
+            x, y, z = location
+            for neighbor in ((x + 1, y, z), (x - 1, y, z), (x, y + 1, z), (x, y - 1, z), (x, y, z + 1), (x, y, z - 1)):
+                if neighbor in distances:
+                    continue
+                nx, ny, nz = neighbor
+                if low_x <= nx <= high_x and low_y <= ny <= high_y and low_z <= nz <= high_z and self.is_free(nx, ny, nz):
+                    distances[neighbor] = distance
+                    queue.append(neighbor)
+                    if targets is not None and neighbor in targets:
+                        left -= 1
+        return distances
+
+    def _chunk_edges(self, chunk):
+        """Get the map of the transition locations of chunk to their ((location, cost) edges to the
+         next chunks, (location, cost) edges inside the chunk or None).
+        """
+        edges = self._edges.get(chunk)
+        if edges is not None:
+            return edges
+        if Instrumentation.enabled:
+            Instrumentation.count("ChunkGraph.chunk")
+        crossings = {}
+        for axis, (dx, dy, dz) in enumerate(ChunkGraph.AXES):
+            for location, neighbor in self._face(chunk, axis):
+                crossings.setdefault(location, []).append((neighbor, 1))
+            previous = chunk[0] - dx, chunk[1] - dy, chunk[2] - dz
+            if min(previous) >= 0:
+                for neighbor, location in self._face(previous, axis):
+                    crossings.setdefault(location, []).append((neighbor, 1))
+        edges = dict((location, (location_crossings, None)) for location, location_crossings in crossings.items())
+        self._edges[chunk] = edges
+        return edges
+
+    def _transition_edges(self, chunk, location):
+        """Get the (location, cost) edges of a transition location of chunk.
+        """
+        edges = self._chunk_edges(chunk)
+        crossings, inner = edges[location]
+        if inner is None:
+            if Instrumentation.enabled:
+                Instrumentation.count("ChunkGraph.transition")
+            distances = self._bfs(location, chunk, edges)
+            inner = [(other, distances[other]) for other in edges if other != location and other in distances]
+            edges[location] = crossings, inner
+        return crossings + inner
+
+    def _refine(self, start, goal, chunks):
+        """Get the shortest list of locations from start to goal (both included) that only goes
+         through the given chunks, with an A* search.
+        """
+        def h(location):
+            return abs(goal[0] - location[0]) + abs(goal[1] - location[1]) + abs(goal[2] - location[2])
+
+        # Ties on f are broken towards the larger g (stored negated) as those locations are closer to
+        # the goal
+        open_list = [(h(start), 0, start)]
+        parents = {start: None}
+        g_scores = {start: 0}
+        closed = set()
+        while open_list:
+            _, g, location = heapq.heappop(open_list)
+            g = -g
+            if location in closed:
+                continue
+            closed.add(location)
+            self.iterations += 1
+            if location == goal:
+                break
+            x, y, z = location
+            for neighbor in ((x + 1, y, z), (x - 1, y, z), (x, y + 1, z), (x, y - 1, z), (x, y, z + 1), (x, y, z - 1)):
+                if neighbor in closed or g + 1 >= g_scores.get(neighbor, g + 2):
+                    continue
+                if self.chunk(neighbor) in chunks and self.is_free(*neighbor):
+                    g_scores[neighbor] = g + 1
+                    parents[neighbor] = location
+                    heapq.heappush(open_list, (g + 1 + h(neighbor), -g - 1, neighbor))
+        path = [goal]
+        while path[-1] != start:
+            path.append(parents[path[-1]])
+        path.reverse()
+        return path
+
+    def find_path(self, start, goal, end_time=None, max_expansions=None):
+        """Get the (path, status) of the list of locations from start to goal (both included).
+         The route is planned over the transitions first and the path is then searched location by
+         location inside the chunks the route passes through and the chunks next to them, so it
+         does not have to go through the transitions. The path is the shortest one inside those
+         chunks, which is not always the shortest one in the world: route costs assume the path
+         goes through the transitions, so a shorter path may go through other chunks. If the end time passes or max_expansions transitions are
+         expanded first, the path leads to the transition closest to the goal, see SearchStatus.
+         The path is None if no path is found.
+        """
+        self._sync()
+        if not self.is_free(*start) or not self.is_free(*goal):
+            return None, None
+        start_chunk = self.chunk(start)
+        goal_chunk = self.chunk(goal)
+        goal_distances = self._bfs(goal, goal_chunk, self._chunk_edges(goal_chunk))
+
+        def h(location):
+            return abs(goal[0] - location[0]) + abs(goal[1] - location[1]) + abs(goal[2] - location[2])
+
+        # A* over the transitions, starting with the edges from start inside its chunk
+        counter = itertools.count()
+        open_list = []
+        parents = {}
+        g_scores = {}
+        targets = list(self._chunk_edges(start_chunk))
+        if start_chunk == goal_chunk:
+            targets.append(goal)
+        start_distances = self._bfs(start, start_chunk, targets)
+        for location in targets:
+            if location in start_distances:
+                g = start_distances[location]
+                g_scores[location] = g
+                parents[location] = start
+                heapq.heappush(open_list, (g + h(location), -g, next(counter), location))
+
+        closed = set()
+        closest = h(start), start
+        expansions = 0
+        while open_list:
+            _, g, _, location = heapq.heappop(open_list)
+            g = -g
+            if location in closed:
+                continue
+            if h(location) < closest[0]:
+                closest = h(location), location
+            status = SearchStatus.GOAL_MET if location == goal else \
+                SearchStatus.limit(expansions, max_expansions, end_time)
+            if status:
+                # Refine the route to the goal, or to the transition closest to it once a limit is reached
+                route = [closest[1] if status != SearchStatus.GOAL_MET else goal]
+                while route[-1] != start:
+                    route.append(parents[route[-1]])
+                chunks = set()
+                for location in route:
+                    i, j, k = self.chunk(location)
+                    chunks.update(((i, j, k), (i + 1, j, k), (i - 1, j, k), (i, j + 1, k), (i, j - 1, k), (i, j, k + 1), (i, j, k - 1)))
+                return self._refine(start, route[0], chunks), status
+            closed.add(location)
+            expansions += 1
+            self.iterations += 1
+
+            chunk = self.chunk(location)
+            edges = self._transition_edges(chunk, location)
+            if chunk == goal_chunk and location in goal_distances:
+                edges.append((goal, goal_distances[location]))
+            for neighbor, cost in edges:
+                if neighbor in closed or g + cost >= g_scores.get(neighbor, g + cost + 1):
+                    continue
+                g_scores[neighbor] = g + cost
+                parents[neighbor] = location
+                heapq.heappush(open_list, (g + cost + h(neighbor), -g - cost, next(counter), neighbor))
+        return None, None
@@ -0,0 +1,61 @@
+import heapq
+
+class ColumnIndex(object):
+    def __init__(self, bucket_size=8):
+        """Spatial index of (x, z) columns bucketed into bucket_size x bucket_size squares.
+        """
+        if bucket_size <= 0:
+            raise ValueError("Bucket size must be greater than zero")
+        self.bucket_size = bucket_size
+        self._buckets = {}
+
+    def _bucket(self, x, z):
+        return x // self.bucket_size, z // self.bucket_size
+
+    def add(self, x, z):
+        """Add the (x, z) column to the index.
+        """
+        self._buckets.setdefault(self._bucket(x, z), set()).add((x, z))
+
+    def remove(self, x, z):
+        """Remove the (x, z) column from the index.
+        """
+        bucket = self._bucket(x, z)
+        columns = self._buckets[bucket]
+        columns.remove((x, z))
+        if not columns:
+            del self._buckets[bucket]
+
+    def __len__(self):
+        return sum(len(columns) for columns in self._buckets.values())
+
+    def nearest(self, x, z):
+        """Generate (distance, x, z) for every indexed column in increasing Manhattan distance from (x, z).
+        Note that the index must not be modified while the generator is used.
+        """
+        if not self._buckets:
+            return
+        center_x, center_z = self._bucket(x, z)
+        max_ring = max(max(abs(bucket_x - center_x), abs(bucket_z - center_z)) for bucket_x, bucket_z in self._buckets)
+
+        heap = []
+        ring = 0
+        while True:
+            # Add the buckets at Chebyshev distance ring from the center bucket
+            for bucket_x in range(center_x - ring, center_x + ring + 1):
+                if abs(bucket_x - center_x) == ring:
+                    bucket_zs = range(center_z - ring, center_z + ring + 1)
+                else:
+                    bucket_zs = set([center_z - ring, center_z + ring])
+                for bucket_z in bucket_zs:
+                    for column_x, column_z in self._buckets.get((bucket_x, bucket_z), ()):
+                        heapq.heappush(heap, (abs(column_x - x) + abs(column_z - z), column_x, column_z))
+
+            # Columns in the rings not added yet are at least ring * bucket_size + 1 away
+            if ring == max_ring:
+                while heap:
+                    yield heapq.heappop(heap)
+                return
+            while heap and heap[0][0] <= ring * self.bucket_size:
+                yield heapq.heappop(heap)
+            ring += 1
@@ -0,0 +1,230 @@
+import bisect
+from collections import deque
+from instrumentation import Instrumentation
+
+class ComponentIndex(object):
+    # Number of locations a local search visits to prove that a new obstacle does not split its
+    # component before the index is built again
+    SPLIT_SEARCH_LIMIT = 4096
+
+    def __init__(self, world, carrying=False):
+        """Connected components of the free locations of a drone world.
+         Free locations are stored as vertical intervals of every (x, z) column, and intervals that
+         touch are joined in a union-find, so two locations are in the same component if their
+         intervals have the same root. If carrying is set, a location is free only if both the
+         drone and the block below it fit. sync() applies the obstacle changes of the world: a
+         freed location joins the intervals around it, and a new obstacle keeps the components
+         unless a local search finds that it splits one, in which case the index is built again.
+        """
+        self.world = world
+        self.carrying = carrying
+        self.rebuilds = 0
+        self._build()
+
+    def _is_free(self, x, y, z):
+        if self.carrying:
+            return self.world.can_move_drone(x, y, z) and self.world.can_move_drone(x, y - 1, z)
+        return self.world.can_move_drone(x, y, z)
+
+    def _new_id(self):
+        interval_id = len(self._parents)
+        self._parents.append(interval_id)
+        return interval_id
+
+    def _find(self, interval_id):
+        parents = self._parents
+        root = interval_id
+        while parents[root] != root:
+            root = parents[root]
+        while parents[interval_id] != root:
+            parents[interval_id], interval_id = root, parents[interval_id]
+        return root
+
+    def _union(self, first, second):
+        first, second = self._find(first), self._find(second)
+        if first != second:
+            self._parents[second] = first
+
+    def _build(self):
+        """Build the intervals and their components from the obstacles of the world.
+        """
+        world = self.world
+        if Instrumentation.enabled:
+            Instrumentation.count("ComponentIndex.build")
+        obstacles = {}
+        for x, y, z in world.get_obstacle_locations():
+            obstacles.setdefault((x, z), []).append(y)
+
+        # Map of (x, z) columns to the sorted bottoms, tops and ids of their free intervals
+        self._bottoms = {}
+        self._intervals = {}
+        self._parents = []
+        for x in range(world.x_min, world.x_max + 1):
+            for z in range(world.z_min, world.z_max + 1):
+                intervals = []
+                bottom = world.y_min
+                for y in sorted(obstacles.get((x, z), ())) + [world.y_max + 1]:
+                    # A carried block cannot be in the obstacle (or below the world) under the interval
+                    if self.carrying:
+                        bottom += 1
+                    if y > bottom:
+                        intervals.append([bottom, y - 1, self._new_id()])
+                    bottom = y + 1
+                self._intervals[(x, z)] = intervals
+                self._bottoms[(x, z)] = [interval[0] for interval in intervals]
+
+        # Join the overlapping intervals of neighbor columns
+        for (x, z), intervals in self._intervals.items():
+            for neighbor in ((x + 1, z), (x, z + 1)):
+                others = self._intervals.get(neighbor)
+                if not others:
+                    continue
+                i = j = 0
+                while i < len(intervals) and j < len(others):
+                    if intervals[i][0] <= others[j][1] and others[j][0] <= intervals[i][1]:
+                        self._union(intervals[i][2], others[j][2])
+                    if intervals[i][1] < others[j][1]:
+                        i += 1
+                    else:
+                        j += 1
+
+        # World version the index is up to date with, later obstacle changes are read from the world
+        self._version = world.version
+        world.track_obstacle_changes(self)
+
+    def _interval_index(self, location):
+        """Get the index of the interval holding location in its column, or None if it is not free.
+        """
+        x, y, z = location
+        bottoms = self._bottoms.get((x, z))
+        if not bottoms:
+            return None
+        index = bisect.bisect_right(bottoms, y) - 1
+        if index < 0 or self._intervals[(x, z)][index][1] < y:
+            return None
+        return index
+
+    def sync(self):
+        """Update the components with the obstacle changes since the last sync.
+        """
+        if self._version == self.world.version:
+            return
+        rebuild = False
+        for x, y, z in self.world.get_obstacle_changes(self):
+            locations = [(x, y, z), (x, y + 1, z)] if self.carrying else [(x, y, z)]
+            for location in locations:
+                free = self._is_free(*location)
+                if free != (self._interval_index(location) is not None):
+                    if free:
+                        self._add(location)
+                    elif not self._remove(location):
+                        rebuild = True
+                        break
+            if rebuild:
+                break
+        if rebuild:
+            self.rebuilds += 1
+            self._build()
+            return
+        self._version = self.world.version
+
+    def _add(self, location):
+        """Add a freed location to the intervals of its column and join it with its neighbors.
+        """
+        x, y, z = location
+        intervals = self._intervals[(x, z)]
+        bottoms = self._bottoms[(x, z)]
+        index = bisect.bisect_right(bottoms, y)
+        below = intervals[index - 1] if index and intervals[index - 1][1] == y - 1 else None
+        above = intervals[index] if index < len(intervals) and intervals[index][0] == y + 1 else None
+        if below and above:
+            below[1] = above[1]
+            self._union(below[2], above[2])
+            del intervals[index]
+            del bottoms[index]
+            interval = below
+        elif below:
+            below[1] = y
+            interval = below
+        elif above:
+            above[0] = y
+            bottoms[index] = y
+            interval = above
+        else:
+            interval = [y, y, self._new_id()]
+            intervals.insert(index, interval)
+            bottoms.insert(index, y)
+        for neighbor in ((x + 1, y, z), (x - 1, y, z), (x, y, z + 1), (x, y, z - 1)):
+            neighbor_index = self._interval_index(neighbor)
+            if neighbor_index is not None:
+                self._union(interval[2], self._intervals[(neighbor[0], neighbor[2])][neighbor_index][2])
+
+    def _remove(self, location):
+        """Remove a new obstacle from the intervals of its column.
+        Return false if its free neighbors may no longer be connected, i.e. the index must be built
+        again.
+        """
+        x, y, z = location
+        intervals = self._intervals[(x, z)]
+        bottoms = self._bottoms[(x, z)]
+        index = self._interval_index(location)
+        interval = intervals[index]
+        if interval[0] == interval[1]:
+            del intervals[index]
+            del bottoms[index]
+        elif interval[0] == y:
+            interval[0] = y + 1
+            bottoms[index] = y + 1
+        elif interval[1] == y:
+            interval[1] = y - 1
+        else:
+            # Split the interval, the upper part stays in the component of the lower part
+            upper = [y + 1, interval[1], self._new_id()]
+            interval[1] = y - 1
+            intervals.insert(index + 1, upper)
+            bottoms.insert(index + 1, y + 1)
+            self._union(interval[2], upper[2])
+        return self._connected_around(location)
+
+    def _connected_around(self, location):
+        """Return true if the free neighbors of location are connected without it.
+        """
+        x, y, z = location
+        neighbors = [neighbor for neighbor in ((x + 1, y, z), (x - 1, y, z), (x, y + 1, z), (x, y - 1, z),
+                                               (x, y, z + 1), (x, y, z - 1))
+                     if self._interval_index(neighbor) is not None]
+        if len(neighbors) < 2:
+            return True
+        targets = set(neighbors[1:])
+        visited = set([neighbors[0]])
+        queue = deque([neighbors[0]])
+        while queue and len(visited) < ComponentIndex.SPLIT_SEARCH_LIMIT:
+            cur_x, cur_y, cur_z = queue.popleft()
+            for neighbor in ((cur_x + 1, cur_y, cur_z), (cur_x - 1, cur_y, cur_z), (cur_x, cur_y + 1, cur_z),
+                             (cur_x, cur_y - 1, cur_z), (cur_x, cur_y, cur_z + 1), (cur_x, cur_y, cur_z - 1)):
+                if neighbor in visited or self._interval_index(neighbor) is None:
+                    continue
+                targets.discard(neighbor)
+                if not targets:
+                    return True
+                visited.add(neighbor)
+                queue.append(neighbor)
+        return False
+
+    def component(self, location):
+        """Get the component id of the (x, y, z) location, or None if the location is not free.
+        Ids are only comparable until the next sync().
+        """
+        index = self._interval_index(location)
+        if index is None:
+            return None
+        x, _, z = location
+        return self._find(self._intervals[(x, z)][index][2])
+
+    def connected(self, start, goal):
+        """Return true if the drone can move from start to goal.
+        """
+        if Instrumentation.enabled:
+            Instrumentation.count("ComponentIndex.connected")
+        component = self.component(start)
+        return component is not None and component == self.component(goal)
@@ -0,0 +1,316 @@
+import heapq
+import time
+from block import Block
+from drone_world_goal import TowerPlanner
+from drone_world_object import DroneWorldAction
+from instrumentation import Instrumentation
+from search.search_status import SearchStatus
+
+WAIT = DroneWorldAction.WAIT
+ATTACH = DroneWorldAction.ATTACH
+RELEASE = DroneWorldAction.RELEASE
+
+# Moves of a drone in a time step, including waiting in place
+STEPS = [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1), WAIT]
+
+class ReservationTable(object):
+    def __init__(self, world):
+        """Space and time occupancy of a drone world shared by the drones of a cooperative plan.
+         Every drone reserves the locations of its body (the drone and its carried block) at each
+         time step. A drone that leaves a location at time step t keeps it reserved at t + 1, so
+         drones never swap locations or follow each other into a location in the same step. The
+         blocks of the world are obstacles until they are picked up, and locations can be held
+         from a time step on, e.g. by a parked drone or a released block.
+        """
+        self.world = world
+
+        # Map of (location, time step) to the drone reserving it
+        self._reserved = {}
+
+        # Map of locations to the last time step they are reserved at
+        self._last = {}
+
+        # Map of locations to the (time step, drone) holding them from that time step on. Released
+        # blocks are held by None.
+        self._held = {}
+
+        # Map of world block locations to the last time step the block is there
+        self._picked = {}
+
+    def is_free(self, location, t, drone):
+        """Return true if the location is free for drone at time step t.
+        """
+        if not self.world.verify_world_bounds(*location):
+            return False
+        owner = self._reserved.get((location, t), drone)
+        if owner != drone:
+            return False
+        held = self._held.get(location)
+        if held and held[0] <= t and held[1] != drone:
+            return False
+        if isinstance(self.world.get_object(*location), Block):
+            picked = self._picked.get(location)
+            return picked is not None and picked < t
+        return True
+
+    def is_parkable(self, location, t, drone):
+        """Return true if drone can stay at the location from time step t on.
+        """
+        if not self.is_free(location, t, drone) or self._last.get(location, -1) >= t:
+            return False
+        held = self._held.get(location)
+        return not held or held[1] == drone
+
+    def reserve(self, location, t, drone):
+        self._reserved[(location, t)] = drone
+        self._last[location] = max(self._last.get(location, -1), t)
+
+    def hold(self, location, t, drone):
+        """Hold the location for drone (or None for a block) from time step t on.
+        """
+        self._held[location] = t, drone
+
+    def unhold(self, location):
+        del self._held[location]
+
+    def pick(self, location, t):
+        """Mark the world block at location as picked up after time step t.
+        """
+        self._picked[location] = t
+
+    def unpick(self, location):
+        del self._picked[location]
+
+
+class CooperativeTowerPlanner(TowerPlanner):
+    def __init__(self, x, y, z, world, max_delay=100, **kwargs):
+        """Construct a tower at the given (x, y, z) location with every drone of the world.
+         Blocks are assigned one at a time to the drone that is free first, and the drone plans its
+         path through space and time around the reservations of the paths planned before it. A
+         path may take at most max_delay time steps more than the straight line distance. The
+         whole plan is made first and then executed on the world one time step at a time. Other
+         keyword arguments are passed to TowerPlanner.
+        """
+        super(CooperativeTowerPlanner, self).__init__(x, y, z, world, **kwargs)
+        self.max_delay = max_delay
+        self.time_steps = 0
+        self.timelines = []
+
+    @staticmethod
+    def _body(location, carrying):
+        x, y, z = location
+        if carrying:
+            return [location, (x, y - 1, z)]
+        return [location]
+
+    def _find_path(self, table, drone, start, start_time, carrying, is_goal, h):
+        """Run a space and time A* search for drone from start at start_time.
+        is_goal(location, t) tests goal locations and h(location) estimates the time steps left.
+        Return the list of drone locations from start_time on or None if no path is found within
+        the deadline and max_expansions limits, so the block is left for another one.
+        """
+        end_time = SearchStatus.end_time(time.time(), self.deadline)
+        expansions = 0
+        budget = start_time + h(start) + self.max_delay
+        open_list = [(h(start), -start_time, 0, start)]
+        parents = {(start, start_time): None}
+        counter = 1
+        while open_list:
+            _, t, _, location = heapq.heappop(open_list)
+            t = -t
+            if SearchStatus.limit(expansions, self.max_expansions, end_time):
+                if Instrumentation.enabled:
+                    Instrumentation.count("CooperativeTowerPlanner.partial_search")
+                self.partial_searches += 1
+                return None
+            expansions += 1
+            self.iterations += 1
+            if is_goal(location, t):
+                path = []
+                node = location, t
+                while node:
+                    path.append(node[0])
+                    node = parents[node]
+                path.reverse()
+                return path
+
+            x, y, z = location
+            body = CooperativeTowerPlanner._body(location, carrying)
+            for dx, dy, dz in STEPS:
+                neighbor = x + dx, y + dy, z + dz
+                if (neighbor, t + 1) in parents or t + 1 + h(neighbor) > budget:
+                    continue
+                cells = body + CooperativeTowerPlanner._body(neighbor, carrying)
+                if all(table.is_free(cell, t + 1, drone) for cell in cells):
+                    parents[(neighbor, t + 1)] = location, t
+                    heapq.heappush(open_list, (t + 1 + h(neighbor), -t - 1, counter, neighbor))
+                    counter += 1
+        return None
+
+    def _reserve_path(self, table, drone, path, start_time, carrying):
+        """Reserve the path of drone and add its moves to the drone timeline.
+        """
+        timeline = self.timelines[drone]
+        for i, location in enumerate(path):
+            t = start_time + i
+            for cell in CooperativeTowerPlanner._body(location, carrying):
+                table.reserve(cell, t, drone)
+            if i:
+                # The previous locations stay reserved until the move is complete
+                for cell in CooperativeTowerPlanner._body(path[i - 1], carrying):
+                    table.reserve(cell, t, drone)
+                previous = path[i - 1]
+                timeline.append((location[0] - previous[0], location[1] - previous[1], location[2] - previous[2]))
+
+    def _next_blocks(self, columns, location):
+        """Get the top block locations of columns, nearest to location first.
+        """
+        x, y, z = location
+        tops = [(column_x, column[-1], column_z) for (column_x, column_z), column in columns.items()]
+        return sorted(tops, key=lambda top: abs(top[0] - x) + abs(top[1] + 1 - y) + abs(top[2] - z))
+
+    def run(self):
+        self.start_time = time.time()
+        drones = self.world.get_drone_count()
+        selected = self.world.get_selected_drone()
+        for drone in range(drones):
+            self.world.select_drone(drone)
+            if self.world.get_attached_block_location():
+                raise RuntimeError("Drones cannot carry blocks when cooperative planning starts")
+        self.world.select_drone(selected)
+
+        # Blocks that can be picked up, by column from the bottom up
+        columns = {}
+        for obj_id, x, y, z in self.world.state():
+            if isinstance(self.world.get_object(x, y, z), Block) and (x != self.goal_x or z != self.goal_z):
+                if self.colors is None or obj_id & self.colors:
+                    columns.setdefault((x, z), []).append(y)
+        for column in columns.values():
+            column.sort()
+
+        table = ReservationTable(self.world)
+        locations = self.world.get_drone_locations()
+        free_times = [0] * drones
+        self.timelines = [[] for _ in range(drones)]
+        for drone, location in enumerate(locations):
+            table.reserve(location, 0, drone)
+            table.hold(location, 0, drone)
+
+        tower = self.goal_x, self.goal_z
+        tower_top = self.world.get_column_height(self.goal_x, self.goal_z)
+        release_time = -1
+
+        # Drones that did not find a parking location, in order. They stay where they are and take
+        # the next blocks until they can park.
+        unparked = []
+
+        def park(drone, start_time):
+            """Move the drone out of the way of the tower and the blocks left and hold its location.
+            If no parking location is found within the limits, the drone holds its location and is
+            added to unparked instead.
+            """
+            location = locations[drone]
+            table.unhold(location)
+            path = self._find_path(table, drone, location, start_time, False,
+                                   lambda cell, t: (cell[0], cell[2]) != tower and (cell[0], cell[2]) not in columns and
+                                   table.is_parkable(cell, t, drone),
+                                   lambda cell: 0)
+            if path is None:
+                if Instrumentation.enabled:
+                    Instrumentation.count("CooperativeTowerPlanner.unparked")
+                table.hold(location, start_time, drone)
+                unparked.append(drone)
+                return
+            self._reserve_path(table, drone, path, start_time, False)
+            locations[drone] = path[-1]
+            free_times[drone] = start_time + len(path) - 1
+            table.hold(path[-1], free_times[drone], drone)
+
+        # Move the drones out of the tower column
+        for drone, location in enumerate(locations):
+            if (location[0], location[2]) == tower:
+                park(drone, 0)
+
+        while self.height != self.goal_y:
+            if unparked:
+                drone = unparked.pop(0)
+            else:
+                drone = min(range(drones), key=lambda index: free_times[index])
+            start_time = free_times[drone]
+            start = locations[drone]
+            table.unhold(start)
+
+            release_goal = self.goal_x, tower_top + self.height + 2, self.goal_z
+            if not self.world.verify_world_bounds(*release_goal):
+                raise RuntimeError("Goal position cannot be achieved")
+            release_block = self.goal_x, release_goal[1] - 1, self.goal_z
+
+            # Plan the pickup and the delivery of the nearest block the drone can reach
+            for block in self._next_blocks(columns, start):
+                hover = block[0], block[1] + 1, block[2]
+                pickup = self._find_path(table, drone, start, start_time, False,
+                                         lambda cell, t: cell == hover and table.is_free(cell, t + 1, drone),
+                                         lambda cell: abs(cell[0] - hover[0]) + abs(cell[1] - hover[1]) + abs(cell[2] - hover[2]))
+                if pickup is None:
+                    continue
+                attach_time = start_time + len(pickup) - 1
+                table.pick(block, attach_time)
+                delivery = self._find_path(table, drone, hover, attach_time + 1, True,
+                                           lambda cell, t: cell == release_goal and t > release_time and
+                                           table.is_free(cell, t + 1, drone),
+                                           lambda cell: abs(cell[0] - release_goal[0]) + abs(cell[1] - release_goal[1]) +
+                                           abs(cell[2] - release_goal[2]))
+                if delivery is not None:
+                    break
+                table.unpick(block)
+            else:
+                raise RuntimeError("Drone {} cannot reach any block".format(drone))
+
+            # Reserve the pickup, attach, delivery and release steps
+            self._reserve_path(table, drone, pickup, start_time, False)
+            for cell in CooperativeTowerPlanner._body(hover, True):
+                table.reserve(cell, attach_time + 1, drone)
+            self.timelines[drone].append(ATTACH)
+            self._reserve_path(table, drone, delivery, attach_time + 1, True)
+            release_time = attach_time + len(delivery)
+            table.reserve(release_goal, release_time + 1, drone)
+            table.hold(release_block, release_time + 1, None)
+            self.timelines[drone].append(RELEASE)
+
+            column = columns[(block[0], block[2])]
+            column.pop()
+            if not column:
+                del columns[(block[0], block[2])]
+            locations[drone] = release_goal
+            free_times[drone] = release_time + 1
+            table.hold(release_goal, free_times[drone], drone)
+            self.height += 1
+            if self.height != self.goal_y:
+                park(drone, free_times[drone])
+
+        self.time_steps = release_time + 1
+        if Instrumentation.enabled:
+            Instrumentation.complete("CooperativeTowerPlanner.plan", self.start_time, iterations=self.iterations)
+        self.execute()
+        self.end_time = time.time()
+        if Instrumentation.enabled:
+            Instrumentation.complete("TowerPlanner.run", self.start_time, moves=self.moves, time_steps=self.time_steps)
+
+    def execute(self):
+        """Execute the drone timelines on the world one time step at a time.
+        """
+        selected = self.world.get_selected_drone()
+        for t in range(max(len(timeline) for timeline in self.timelines)):
+            for drone, timeline in enumerate(self.timelines):
+                if t >= len(timeline) or timeline[t] == WAIT:
+                    continue
+                self.world.select_drone(drone)
+                if timeline[t] == ATTACH:
+                    self.world.attach()
+                elif timeline[t] == RELEASE:
+                    self.world.release()
+                else:
+                    if self.world.move(*timeline[t]) is False:
+                        raise RuntimeError("Drone {} cannot move at time step {}".format(drone, t))
+                    self.moves += 1
+        self.world.select_drone(selected)
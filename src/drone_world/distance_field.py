@@ -0,0 +1,158 @@
+import heapq
+from instrumentation import Instrumentation
+
+class DistanceField(object):
+    def __init__(self, world, goal, origin):
+        """Distances from the free locations of world to the goal location around obstacles.
+         Distances are computed lazily with a reverse A* search from the goal towards the origin
+         location (usually the drone) that is resumed whenever an unknown location is queried, so a
+         query costs O(1) once its location is known. sync() repairs the field with the obstacle
+         changes of the world instead of starting over: a new obstacle only drops the locations
+         whose shortest path went through it, and a freed location only restarts the search if it
+         is next to a location whose distance is known.
+        """
+        self.world = world
+        self.goal = goal
+        self.origin = origin
+        self.resets = 0
+        self._reset()
+
+    def _reset(self):
+        # Map of the locations whose distance is known to their distance, and their largest f
+        self._closed = {}
+        self._max_f = 0
+
+        # Map of the locations reached by the search to their best distance so far and the
+        # location their shortest path goes through next (None for the goal)
+        self._g_scores = {}
+        self._parents = {}
+        self._open = []
+        if self.world.can_move_drone(*self.goal):
+            self._push(self.goal, 0, None)
+
+        # World version the field is up to date with, later obstacle changes are read from the world
+        self._version = self.world.version
+        self.world.track_obstacle_changes(self)
+
+    def _h(self, location):
+        x, y, z = location
+        origin_x, origin_y, origin_z = self.origin
+        return abs(origin_x - x) + abs(origin_y - y) + abs(origin_z - z)
+
+    def _push(self, location, g, parent):
+        # Ties on f are broken towards the larger g (stored negated) as those locations are closer
+        # to the origin
+        self._g_scores[location] = g
+        self._parents[location] = parent
+        heapq.heappush(self._open, (g + self._h(location), -g, location))
+
+    def sync(self):
+        """Update the field with the obstacle changes since the last sync.
+        """
+        if self._version == self.world.version:
+            return
+        can_move_drone = self.world.can_move_drone
+
+        # Freed locations are checked before any repair, which already searches the world as it is now
+        new_changes = self.world.get_obstacle_changes(self)
+        if any(self._freed(location) for location in new_changes if can_move_drone(*location)):
+            self.resets += 1
+            if Instrumentation.enabled:
+                Instrumentation.count("DistanceField.reset")
+            self._reset()
+            return
+        for location in new_changes:
+            if location in self._g_scores and not can_move_drone(*location):
+                self._blocked(location)
+        self._version = self.world.version
+
+    def _freed(self, location):
+        """Return true if the freed location may shorten known distances, i.e. the search must start
+         over.
+        The shortest path to a known location can only go through the freed location if the location
+        before it is known as well, since the search knows every location with a lower f (see
+        _blocked()).
+        """
+        if location in self._g_scores:
+            return False
+        if location == self.goal:
+            return True
+        x, y, z = location
+        closed = self._closed
+        return (x + 1, y, z) in closed or (x - 1, y, z) in closed or (x, y + 1, z) in closed or \
+            (x, y - 1, z) in closed or (x, y, z + 1) in closed or (x, y, z - 1) in closed
+
+    def _blocked(self, location):
+        """Drop the locations whose shortest path goes through a new obstacle and search them again
+        from their known neighbors, until every location with a lower f than a known location is
+        known again.
+        """
+        # Map of the reached locations to whether their path goes through the obstacle
+        through = {location: True}
+        parents = self._parents
+        for current in self._g_scores.keys():
+            path = []
+            while current is not None and current not in through:
+                path.append(current)
+                current = parents[current]
+            dropped = current is not None and through[current]
+            for previous in path:
+                through[previous] = dropped
+        dropped = [current for current, value in through.items() if value]
+        for current in dropped:
+            self._closed.pop(current, None)
+            del self._g_scores[current]
+            del parents[current]
+
+        # Open entries of dropped locations are skipped as they no longer match the g scores
+        closed = self._closed
+        for current in dropped:
+            if current == location:
+                continue
+            x, y, z = current
+            best = None
+            for neighbor in ((x + 1, y, z), (x - 1, y, z), (x, y + 1, z), (x, y - 1, z), (x, y, z + 1), (x, y, z - 1)):
+                if neighbor in closed and (best is None or closed[neighbor] < closed[best]):
+                    best = neighbor
+            if best is not None and self.world.can_move_drone(*current):
+                self._push(current, closed[best] + 1, best)
+        self._resume()
+
+    def _resume(self, location=None):
+        """Resume the search until location is closed and return its distance, or None if it cannot
+         reach the goal. Without a location, the search stops once no open location has a lower f
+         than a closed one.
+        """
+        closed = self._closed
+        open_list = self._open
+        g_scores = self._g_scores
+        can_move_drone = self.world.can_move_drone
+        while open_list:
+            if location is None and open_list[0][0] >= self._max_f:
+                return None
+            f, g, current = heapq.heappop(open_list)
+            g = -g
+            if current in closed or g_scores.get(current) != g:
+                continue
+            closed[current] = g
+            self._max_f = max(self._max_f, f)
+            cur_x, cur_y, cur_z = current
+            for neighbor in ((cur_x + 1, cur_y, cur_z), (cur_x - 1, cur_y, cur_z),
+                             (cur_x, cur_y + 1, cur_z), (cur_x, cur_y - 1, cur_z),
+                             (cur_x, cur_y, cur_z + 1), (cur_x, cur_y, cur_z - 1)):
+                if neighbor in closed or g + 1 >= g_scores.get(neighbor, g + 2):
+                    continue
+                if can_move_drone(*neighbor):
+                    self._push(neighbor, g + 1, current)
+            if current == location:
+                return g
+        return None
+
+    def distance(self, x, y, z):
+        """Return the number of drone moves from (x, y, z) to the goal.
+        If (x, y, z) cannot reach the goal, None is returned.
+        """
+        location = x, y, z
+        if location in self._closed:
+            return self._closed[location]
+        return self._resume(location)
@@ -1,4 +1,4 @@
-from drone_world_object import DroneWorldObject
+from drone_world_object import DroneWorldObject, DroneWorldAction
 from block import Block
 
 class Drone(DroneWorldObject):
@@ -15,6 +15,11 @@ class Drone(DroneWorldObject):
         if isinstance(world_object, Block):
             self._attached_block = world_object
 
+    def get_attached_block(self):
+        """Return the attached Block or None if no block is attached.
+        """
+        return self._attached_block
+
     def release(self):
         """Release an attached Block.
         """
@@ -25,53 +30,31 @@ class Drone(DroneWorldObject):
 
     def move(self, dx, dy, dz):
         """Move the drone in the world.
-         If a block is attached, need to make extra checks to verify space in the world for both
-         the drone and attached block.
+         If a block is attached, the action mask of the drone and block is checked first so both can
+         be moved without a rollback. Only single axis unit moves are supported with a block.
          If move is unsuccessful, false is returned
         """
         if not self._attached_block:
             return super(Drone, self).move(dx, dy, dz)
-        else:
 
-            # Move the block and the drone
-            block_moved = False
-            drone_moved = False
-            if dy < 0:
-                block_moved = self._attached_block.move(dx, dy, dz)
-                if block_moved:
-                    drone_moved = super(Drone, self).move(dx, dy, dz)
-            else:
-                drone_moved = super(Drone, self).move(dx, dy, dz)
-                if drone_moved:
-                    block_moved = self._attached_block.move(dx, dy, dz)
+        bit = DroneWorldAction.BITS.get((dx, dy, dz), 0)
+        if not bit & self._world.get_action_mask(self.location(), self._attached_block.location()):
+            return False
 
-            # If the moves were not successful, rollback any block or drone moves
-            if block_moved and drone_moved:
-                return True
-            elif block_moved and not drone_moved:
-                self._attached_block.move(-dx, -dy, -dz)
-            elif not block_moved and drone_moved:
-                super(Drone, self).move(-dx, -dy, -dz)
-        return False
-
-    def actions(self):
-        if not self._attached_block:
-            return super(Drone, self).actions()
+        # Move the lower of the drone and block first so the other can move into its place
+        if dy < 0:
+            self._attached_block.move(dx, dy, dz)
+            super(Drone, self).move(dx, dy, dz)
         else:
-            drone_actions = super(Drone, self).actions()
-            block_actions = self._attached_block.actions()
-
-            # Find the intersection of drone and block actions. Note that this does not account
-            # for valid movements along the y-axis since super().actions() will report that the
-            # drone cannot move done since the block is there.
-            actions = list(set(drone_actions) & set(block_actions))
+            super(Drone, self).move(dx, dy, dz)
+            self._attached_block.move(dx, dy, dz)
+        return True
 
-            # Add in y-axis actions
-            if self._world.can_move_object(self.x, self.y + 1, self.z):
-                actions.append((0, 1, 0))
-            if self._world.can_move_object(self._attached_block.x, self._attached_block.y - 1, self._attached_block.z):
-                actions.append((0, -1, 0))
-            return actions
+    def actions(self):
+        """Return all the possible (dx, dy, dz) actions for the drone and attached block.
+        """
+        block_location = self._attached_block.location() if self._attached_block else None
+        return DroneWorldAction.mask_to_actions(self._world.get_action_mask(self.location(), block_location))
 
     def speak(self, msg):
         """ Not implemented speak function.
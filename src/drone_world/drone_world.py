@@ -1,9 +1,32 @@
+import os
 import csv
-from drone_world_object import DroneWorldObjectId
+import bisect
+import array
+import struct
+import sys
+import hashlib
+import weakref
+from collections import OrderedDict
+from drone_world_object import DroneWorldObjectId, DroneWorldAction
 from drone import Drone
 from block import Block
+from distance_field import DistanceField
+from column_index import ColumnIndex
+from chunk_graph import ChunkGraph
+from jump_grid import JumpGrid
+from component_index import ComponentIndex
+from instrumentation import Instrumentation
 
 class DroneWorld(object):
+    # Binary snapshot header: magic, format version, (x_min, x_max, y_min, y_max, z_min, z_max) and
+    # the object count. The header is followed by the x, y and z int16 arrays and the id uint8 array.
+    SNAPSHOT_MAGIC = b"DWLD"
+    SNAPSHOT_VERSION = 1
+    SNAPSHOT_HEADER = struct.Struct("<4sH6iI")
+
+    # Number of distance fields kept in the cache
+    DISTANCE_FIELD_CAPACITY = 16
+
     def __init__(self, x_min=-50, x_max=50, y_min=0, y_max=50, z_min=-50, z_max=50):
         # Verify drone world dimensions
         if x_min > x_max:
@@ -19,18 +42,101 @@ class DroneWorld(object):
         self.y_max = y_max
         self.z_max = z_max
 
-        # List of objects populated in the world
+        # List of objects populated in the world. The selected drone is the one the drone methods
+        # (move(), attach(), get_drone_location(), ...) act on.
         self._drone = None
+        self._drones = []
         self._blocks = []
 
+        # Map of (x, y, z) locations to the object occupying that location
+        self._occupied = {}
+
+        # Map of (x, z) columns to the sorted y locations of the blocks in that column
+        self._columns = {}
+
+        # Spatial index of the (x, z) columns that have blocks
+        self._column_index = ColumnIndex()
+
+        # Incremented whenever the locations considered free by can_move_drone() change
+        self.obstacle_version = 0
+
+        # Map of goal locations to their DistanceField, least recently used first, kept up to date
+        # through get_obstacle_changes()
+        self._distance_fields = OrderedDict()
+
+        # Incremented on every occupancy change (including drone moves) and on attach and release
+        self.version = 0
+
+        # Locations whose obstacle state changed, in order, so caches can invalidate the entries
+        # that pass through them. The drone and attached block are not obstacles to the drone. Only
+        # the changes some tracked consumer has not read yet are kept, see get_obstacle_changes().
+        self._obstacle_changes = []
+
+        # Number of changes dropped from the start of _obstacle_changes, and map of the consumers of
+        # the changes to the number of changes they read
+        self._change_offset = 0
+        self._change_cursors = weakref.WeakKeyDictionary()
+
+        # Map of (chunk size, carrying) to the ChunkGraph of the world, kept up to date through
+        # get_obstacle_changes()
+        self._chunk_graphs = {}
+
+        # Map of carrying to the JumpGrid of the world, kept up to date through get_obstacle_changes()
+        self._jump_grids = {}
+
+        # Map of carrying to the ComponentIndex of the world, kept up to date through
+        # get_obstacle_changes()
+        self._component_indexes = {}
+
     def add_drone(self, x, y, z):
         """Add a drone to the world.
+         The first drone added is selected. Use select_drone() to act on the other drones.
         """
-        if self._drone:
-            raise RuntimeError("Drone is already allocated in the world")
         if not self.can_move_object(x, y, z):
             raise ValueError("Cannot allocate drone at occupied location ({}, {}, {})".format(x, y, z))
-        self._drone = Drone(self, x, y, z, DroneWorldObjectId.DRONE)
+        self._place_drone(x, y, z)
+
+    def _place_drone(self, x, y, z):
+        """Create the drone at (x, y, z) without any checks.
+        """
+        drone = Drone(self, x, y, z, DroneWorldObjectId.DRONE)
+        self._drones.append(drone)
+        self._occupied[drone.location()] = drone
+        self.version += 1
+        if not self._drone:
+            self._drone = drone
+        else:
+            self.obstacle_version += 1
+            self._add_obstacle_change(drone.location())
+
+    def select_drone(self, index):
+        """Select the drone (by the order drones were added in) the drone methods act on.
+        The other drones and their attached blocks are obstacles to the selected drone.
+        """
+        drone = self._drones[index]
+        if drone is self._drone:
+            return
+        for changed in (self._drone, drone):
+            self._add_obstacle_change(changed.location())
+            block = changed.get_attached_block()
+            if block:
+                self._add_obstacle_change(block.location())
+        self._drone = drone
+        self.obstacle_version += 1
+        self.version += 1
+
+    def get_selected_drone(self):
+        """Get the index of the selected drone.
+        """
+        return self._drones.index(self._drone)
+
+    def get_drone_count(self):
+        return len(self._drones)
+
+    def get_drone_locations(self):
+        """Get the (x, y, z) location of every drone, in the order drones were added in.
+        """
+        return [drone.location() for drone in self._drones]
 
     def add_block(self, x, y, z, obj_id):
         """Add a block to the world.
@@ -42,9 +148,21 @@ class DroneWorld(object):
             raise ValueError("Cannot allocate block at occupied location ({}, {}, {})".format(x, y, z))
         if not self._drone and x == 0 and z == 0:
             raise ValueError("Cannot allocate block at reserved drone location of (0, 0, 0)")
-        elif x == self._drone.x and z == self._drone.z and y > self._drone.y:
-            raise ValueError("Cannot allocate a block above the drone")
-        self._blocks.append(Block(self, x, y, z, obj_id))
+        for drone in self._drones:
+            if x == drone.x and z == drone.z and y > drone.y:
+                raise ValueError("Cannot allocate a block above the drone")
+        self._place_block(x, y, z, obj_id)
+
+    def _place_block(self, x, y, z, obj_id):
+        """Create a block at (x, y, z) without any checks. The block still drops.
+        """
+        block = Block(self, x, y, z, obj_id)
+        self._blocks.append(block)
+        self._occupied[block.location()] = block
+        self._insert_column(block.x, block.y, block.z)
+        self.obstacle_version += 1
+        self.version += 1
+        self._add_obstacle_change(block.location())
 
     def add_object(self, x, y, z, string):
         """Add object to the world.
@@ -69,47 +187,301 @@ class DroneWorld(object):
     def get_object(self, x, y, z):
         """Get object from world based on (x, y, z) location.
         """
-        for block in self._blocks:
-            if (x, y, z) == block.location():
-                return block
-        if (x, y, z) == self._drone.location():
-            return self._drone
-        return None
+        if Instrumentation.enabled:
+            Instrumentation.count("DroneWorld.get_object")
+        return self._occupied.get((x, y, z))
 
     def can_move_object(self, new_x, new_y, new_z):
         """Verify that an object can move to the specified location.
         As of now, if the desired location is not occupied, the object can be moved.
         """
+        if Instrumentation.enabled:
+            Instrumentation.count("DroneWorld.can_move_object")
         if not self.verify_world_bounds(new_x, new_y, new_z):
             return False
+        return (new_x, new_y, new_z) not in self._occupied
 
-        for block in self._blocks:
-            if (new_x, new_y, new_z) == block.location():
-                return False
-        if self._drone:
-            if (new_x, new_y, new_z) == self._drone.location():
-                return False
-        return True
+    def can_move_drone(self, new_x, new_y, new_z):
+        """Verify that the drone (or its attached block) can move to the specified location.
+        Unlike can_move_object(), the locations held by the drone and its attached block are
+        considered free. This allows a search to check drone locations without moving the drone.
+        """
+        if not self.verify_world_bounds(new_x, new_y, new_z):
+            return False
+        world_object = self._occupied.get((new_x, new_y, new_z))
+        return world_object is None or world_object is self._drone or \
+            world_object is self._drone.get_attached_block()
+
+    def get_action_mask(self, drone_location, block_location=None):
+        """Get the action mask of a drone at drone_location carrying a block at block_location.
+        Bit i of the mask is set when DroneWorldAction.MOVES[i] is legal. As in can_move_drone(),
+        the locations held by the drone and its attached block are considered free, so the mask
+        can be computed for drone locations other than the current one.
+        """
+        free = self.can_move_drone
+        x, y, z = drone_location
+        if not block_location:
+            return (free(x + 1, y, z) |
+                    free(x - 1, y, z) << 1 |
+                    free(x, y + 1, z) << 2 |
+                    free(x, y - 1, z) << 3 |
+                    free(x, y, z + 1) << 4 |
+                    free(x, y, z - 1) << 5)
+
+        # Horizontal moves need space for both the drone and block, moving up only needs space for
+        # the drone and moving down only needs space for the block
+        block_x, block_y, block_z = block_location
+        return ((free(x + 1, y, z) and free(block_x + 1, block_y, block_z)) |
+                (free(x - 1, y, z) and free(block_x - 1, block_y, block_z)) << 1 |
+                free(x, y + 1, z) << 2 |
+                free(block_x, block_y - 1, block_z) << 3 |
+                (free(x, y, z + 1) and free(block_x, block_y, block_z + 1)) << 4 |
+                (free(x, y, z - 1) and free(block_x, block_y, block_z - 1)) << 5)
+
+    def update_object_location(self, world_object, old_location):
+        """Update the occupancy map after an object moved away from old_location.
+        Objects that are not yet placed in the world (e.g. a block dropping while it is being
+        added) are not tracked and are ignored.
+        """
+        if self._occupied.get(old_location) is world_object:
+            del self._occupied[old_location]
+            self._occupied[world_object.location()] = world_object
+            self.version += 1
+            if not isinstance(world_object, Drone):
+                self._update_column(old_location, world_object.location())
+            if world_object is not self._drone and world_object is not self._drone.get_attached_block():
+                # Other drones and the blocks they carry are obstacles to the selected drone
+                self.obstacle_version += 1
+                self._add_obstacle_change(old_location)
+                self._add_obstacle_change(world_object.location())
+
+    def _update_column(self, old_location, new_location):
+        """Move a block y location from the column of old_location to the column of new_location.
+        """
+        old_x, old_y, old_z = old_location
+        column = self._columns[(old_x, old_z)]
+        del column[bisect.bisect_left(column, old_y)]
+        if not column:
+            del self._columns[(old_x, old_z)]
+            self._column_index.remove(old_x, old_z)
+        self._insert_column(*new_location)
+
+    def _insert_column(self, x, y, z):
+        """Add a block y location to the (x, z) column.
+        """
+        column = self._columns.get((x, z))
+        if column is None:
+            column = self._columns[(x, z)] = []
+            self._column_index.add(x, z)
+        bisect.insort(column, y)
+
+    def get_column_height(self, x, z):
+        """Get the y location of the highest block in the (x, z) column.
+        If the column does not have any blocks, y-min - 1 is returned.
+        """
+        column = self._columns.get((x, z))
+        if column:
+            return column[-1]
+        return self.y_min - 1
+
+    def get_nearest_columns(self, x, z):
+        """Generate (distance, x, z) for the columns with blocks in increasing Manhattan distance from (x, z).
+        The world must not change while the generator is used.
+        """
+        return self._column_index.nearest(x, z)
+
+    def get_drop_height(self, x, y, z):
+        """Get the y location an object at (x, y, z) would fall to.
+        The object lands on top of the highest block (or drone) below it in the column.
+        """
+        drop_y = self.y_min
+        column = self._columns.get((x, z))
+        if column:
+            index = bisect.bisect_left(column, y)
+            if index:
+                drop_y = column[index - 1] + 1
+        for drone in self._drones:
+            if drone.x == x and drone.z == z and drop_y <= drone.y < y:
+                drop_y = drone.y + 1
+        return drop_y
 
     def get_drone_location(self):
-        """Get the current drone (x, y, z) location.
+        """Get the current (x, y, z) location of the selected drone.
         """
         return self._drone.x, self._drone.y, self._drone.z
 
+    def get_attached_block_location(self):
+        """Get the (x, y, z) location of the block attached to the drone or None if not attached.
+        """
+        block = self._drone.get_attached_block()
+        if block:
+            return block.location()
+        return None
+
     def attach(self):
         """Attach a block to the drone.
         """
         self._drone.attach()
+        self.obstacle_version += 1
+        self.version += 1
+        block = self._drone.get_attached_block()
+        if block:
+            self._add_obstacle_change(block.location())
 
     def release(self):
         """Release a block from the drone.
         """
+        block = self._drone.get_attached_block()
         self._drone.release()
+        self.obstacle_version += 1
+        self.version += 1
+        self._add_obstacle_change(block.location())
+
+    def _add_obstacle_change(self, location):
+        # Changes are only logged while a consumer may read them
+        if self._change_cursors:
+            self._obstacle_changes.append(location)
+        else:
+            self._change_offset += len(self._obstacle_changes) + 1
+            del self._obstacle_changes[:]
+
+    def track_obstacle_changes(self, consumer):
+        """Log the obstacle changes from now on for consumer, e.g. a cache that is up to date with the
+         world as it is now. Consumers are weakly referenced, so the changes are no longer kept for
+         them once they are garbage collected.
+        """
+        self._change_cursors[consumer] = self._change_offset + len(self._obstacle_changes)
+
+    def get_obstacle_changes(self, consumer):
+        """Get the list of (x, y, z) locations whose obstacle state changed since consumer last got
+         them, or since it was tracked. Changes every consumer got are dropped from the log.
+        """
+        changes = self._obstacle_changes
+        new_changes = changes[self._change_cursors[consumer] - self._change_offset:]
+        self._change_cursors[consumer] = self._change_offset + len(changes)
+
+        # The read changes are dropped once they are half of the log, so dropping a change is O(1)
+        # amortized
+        read = min(self._change_cursors.values()) - self._change_offset
+        if read and read * 2 >= len(changes):
+            del changes[:read]
+            self._change_offset += read
+        return new_changes
+
+    def get_distance_field(self, x, y, z):
+        """Get the DistanceField to the (x, y, z) goal.
+        The last DISTANCE_FIELD_CAPACITY fields are kept and repaired with the obstacle changes of the
+        world. A new field searches from the goal towards the current drone location.
+        """
+        goal = x, y, z
+        field = self._distance_fields.pop(goal, None)
+        if not field:
+            field = DistanceField(self, goal, self.get_drone_location())
+            while len(self._distance_fields) >= DroneWorld.DISTANCE_FIELD_CAPACITY:
+                self._distance_fields.popitem(last=False)
+        self._distance_fields[goal] = field
+        field.sync()
+        return field
+
+    def get_chunk_graph(self, size=8, carrying=False):
+        """Get the ChunkGraph of the world with size x size x size chunks, for a drone with or
+         without a block.
+        """
+        key = size, carrying
+        graph = self._chunk_graphs.get(key)
+        if not graph:
+            graph = ChunkGraph(self, size, carrying)
+            self._chunk_graphs[key] = graph
+        return graph
+
+    def get_jump_grid(self, carrying=False):
+        """Get the JumpGrid of the world for a drone with or without a block.
+        Grids are created once and updated with the obstacle changes of the world.
+        """
+        grid = self._jump_grids.get(carrying)
+        if not grid:
+            grid = JumpGrid(self, carrying)
+            self._jump_grids[carrying] = grid
+        grid.sync()
+        return grid
+
+    def get_component_index(self, carrying=False):
+        """Get the ComponentIndex of the free locations of the world for a drone with or without a
+         block. Indexes are created once and updated with the obstacle changes of the world.
+        """
+        index = self._component_indexes.get(carrying)
+        if not index:
+            index = ComponentIndex(self, carrying)
+            self._component_indexes[carrying] = index
+        index.sync()
+        return index
+
+    def is_reachable(self, x, y, z):
+        """Return true if the selected drone (and its attached block) can move to (x, y, z).
+        This only compares the connected components of the two locations, no search is run.
+        """
+        carrying = self._drone.get_attached_block() is not None
+        return self.get_component_index(carrying).connected(self._drone.location(), (x, y, z))
+
+    def get_obstacle_locations(self):
+        """Get the locations of the objects that are obstacles to the selected drone.
+        """
+        block = self._drone.get_attached_block()
+        return [location for location, world_object in self._occupied.items()
+                if world_object is not self._drone and world_object is not block]
+
+    def execute_plan(self, actions):
+        """Apply a sequence of (dx, dy, dz) actions to the selected drone and its attached block.
+         The whole sequence is checked before the world is changed, so either every action is
+         applied or none is. Return None on success or the index of the first illegal action.
+        """
+        if Instrumentation.enabled:
+            Instrumentation.count("DroneWorld.execute_plan")
+            Instrumentation.count("DroneWorld.execute_plan.actions", len(actions))
+        block = self._drone.get_attached_block()
+        drone_x, drone_y, drone_z = self._drone.location()
+        block_location = block.location() if block else None
+        for index, action in enumerate(actions):
+            dx, dy, dz = action
+            bit = DroneWorldAction.BITS.get((dx, dy, dz), 0)
+            if bit:
+                if not bit & self.get_action_mask((drone_x, drone_y, drone_z), block_location):
+                    return index
+            elif block or (dx, dy, dz) == (0, 0, 0) or not self.can_move_drone(drone_x + dx, drone_y + dy, drone_z + dz):
+                # Only single axis unit moves are supported with a block
+                return index
+            drone_x += dx
+            drone_y += dy
+            drone_z += dz
+            if block_location:
+                block_location = drone_x, drone_y - 1, drone_z
+
+        if actions:
+            moves = [(self._drone, (drone_x, drone_y, drone_z))]
+            if block:
+                moves.append((block, block_location))
+            self._relocate(moves)
+        return None
+
+    def _relocate(self, moves):
+        """Move objects to new locations at once without any checks.
+        moves is a list of (object, new location) tuples.
+        """
+        for world_object, _ in moves:
+            del self._occupied[world_object.location()]
+        for world_object, location in moves:
+            old_location = world_object.location()
+            world_object.x, world_object.y, world_object.z = location
+            self._occupied[location] = world_object
+            if not isinstance(world_object, Drone):
+                self._update_column(old_location, location)
+        self.version += 1
 
     def move(self, dx, dy, dz):
-        """Move the drone in the drone world.
+        """Move the selected drone in the drone world.
+        If the move is unsuccessful, false is returned.
         """
-        self._drone.move(dx, dy, dz)
+        return self._drone.move(dx, dy, dz)
 
     def speak(self, msg):
         """Not implemented.
@@ -122,16 +494,157 @@ class DroneWorld(object):
         state = []
         for block in self._blocks:
             state.append(block.state())
-        state.append(self._drone.state())
+        for drone in self._drones:
+            state.append(drone.state())
         return state
 
     def initialize(self, filename):
         """Initialize the drone world from a file.
+        The rows are checked with the add_drone() and add_block() rules, and the blocks are dropped,
+        in a single pass over the occupied locations and the block columns, without creating any
+        object. If any row is invalid, a ValueError listing all the invalid rows is raised and the
+        world is left unchanged. Otherwise the objects are placed at their resolved locations
+        without any checks, as in load().
         """
         with open(filename, "rb") as csv_file:
-            reader = csv.reader(csv_file, delimiter=",")
-            for row in reader:
-                self.add_object(int(row[0]), int(row[1]), int(row[2]), row[3])
+            rows = list(csv.reader(csv_file, delimiter=","))
+
+        # Occupied locations, sorted block y locations of the (x, z) columns and drone y locations
+        # of the columns as if the valid rows so far were added. Block columns of the world are
+        # copied when a row first drops a block in them.
+        occupied = set(self._occupied)
+        columns = {}
+        drone_columns = {}
+        for drone in self._drones:
+            drone_columns.setdefault((drone.x, drone.z), []).append(drone.y)
+        has_drone = self._drone is not None
+        obj_ids = {}
+        drones = []
+        blocks = []
+        errors = []
+        for line, row in enumerate(rows, 1):
+            if not row:
+                continue
+            try:
+                if len(row) != 4:
+                    raise ValueError("Expected 4 values but found {}".format(len(row)))
+                x, y, z = int(row[0]), int(row[1]), int(row[2])
+                if row[3] not in obj_ids:
+                    obj_ids[row[3]] = DroneWorldObjectId.str_to_id(row[3])
+                obj_id = obj_ids[row[3]]
+                if not self.verify_world_bounds(x, y, z) or (x, y, z) in occupied:
+                    raise ValueError("Cannot allocate {} at occupied location ({}, {}, {})".format(
+                        "drone" if obj_id == DroneWorldObjectId.DRONE else "block", x, y, z))
+                if obj_id == DroneWorldObjectId.DRONE:
+                    drones.append((x, y, z))
+                    drone_columns.setdefault((x, z), []).append(y)
+                    has_drone = True
+                else:
+                    if not has_drone and x == 0 and z == 0:
+                        raise ValueError("Cannot allocate block at reserved drone location of (0, 0, 0)")
+                    if any(drone_y < y for drone_y in drone_columns.get((x, z), ())):
+                        raise ValueError("Cannot allocate a block above the drone")
+
+                    # The block drops on top of the highest block below it, drones are all above it
+                    column = columns.get((x, z))
+                    if column is None:
+                        column = columns[(x, z)] = list(self._columns.get((x, z), ()))
+                    index = bisect.bisect_left(column, y)
+                    y = column[index - 1] + 1 if index else self.y_min
+                    column.insert(index, y)
+                    blocks.append((x, y, z, obj_id))
+                occupied.add((x, y, z))
+            except ValueError as e:
+                errors.append("Row {}: {}".format(line, e))
+        if errors:
+            raise ValueError("Cannot initialize drone world from {}:\n{}".format(filename, "\n".join(errors)))
+
+        # Place the drones, then the blocks from the bottom up so they do not drop, and restore the
+        # row order of the blocks
+        for x, y, z in drones:
+            self._place_drone(x, y, z)
+        count = len(self._blocks)
+        placed = {}
+        for i in sorted(range(len(blocks)), key=lambda index: blocks[index][1]):
+            self._place_block(*blocks[i])
+            placed[i] = self._blocks[-1]
+        self._blocks[count:] = [placed[i] for i in range(len(blocks))]
+
+    def save(self, filename):
+        """Save the drone world to a binary snapshot file.
+        Objects are saved in state() order. Note that an attached block is saved as a regular block
+        and drops when the snapshot is loaded.
+        """
+        objects = self._blocks + self._drones
+        bounds = self.x_min, self.x_max, self.y_min, self.y_max, self.z_min, self.z_max
+        if min(bounds) < -2 ** 15 or max(bounds) >= 2 ** 15:
+            raise ValueError("Drone world bounds do not fit in a snapshot")
+        coordinates = [array.array("h", [getattr(obj, axis) for obj in objects]) for axis in "xyz"]
+        ids = array.array("B", [obj.id for obj in objects])
+        if sys.byteorder == "big":
+            for values in coordinates:
+                values.byteswap()
+        with open(filename, "wb") as snapshot_file:
+            snapshot_file.write(DroneWorld.SNAPSHOT_HEADER.pack(DroneWorld.SNAPSHOT_MAGIC, DroneWorld.SNAPSHOT_VERSION,
+                                                                *(bounds + (len(objects),))))
+            for values in coordinates + [ids]:
+                values.tofile(snapshot_file)
+
+    @classmethod
+    def load(cls, filename):
+        """Create a drone world from a binary snapshot file.
+        The x, y, z and id arrays are read straight into arrays and the objects are placed without
+        the add_drone() and add_block() checks, since a snapshot always holds a valid world. Note
+        that the world is still made of Block and Drone objects, so every process that loads a
+        snapshot has its own copy of the world.
+        """
+        header_size = DroneWorld.SNAPSHOT_HEADER.size
+        with open(filename, "rb") as snapshot_file:
+            data = snapshot_file.read(header_size)
+            if len(data) < header_size:
+                raise ValueError("Invalid drone world snapshot: {}".format(filename))
+            header = DroneWorld.SNAPSHOT_HEADER.unpack(data)
+            magic, version, bounds, count = header[0], header[1], header[2:8], header[8]
+            if magic != DroneWorld.SNAPSHOT_MAGIC or version != DroneWorld.SNAPSHOT_VERSION:
+                raise ValueError("Invalid drone world snapshot: {}".format(filename))
+            if os.fstat(snapshot_file.fileno()).st_size != header_size + 7 * count:
+                raise ValueError("Truncated drone world snapshot: {}".format(filename))
+
+            # Read the x, y, z and id arrays
+            columns = []
+            for typecode in "hhhB":
+                values = array.array(typecode)
+                values.fromfile(snapshot_file, count)
+                if values.itemsize > 1 and sys.byteorder == "big":
+                    values.byteswap()
+                columns.append(values)
+
+        # Place the blocks from the bottom up so they do not drop, then restore the saved order
+        world = cls(*bounds)
+        xs, ys, zs, ids = columns
+        for i in range(count):
+            if ids[i] == DroneWorldObjectId.DRONE:
+                world._place_drone(xs[i], ys[i], zs[i])
+        order = [i for i in range(count) if ids[i] != DroneWorldObjectId.DRONE]
+        blocks = {}
+        for i in sorted(order, key=lambda index: ys[index]):
+            world._place_block(xs[i], ys[i], zs[i], ids[i])
+            blocks[i] = world._blocks[-1]
+        world._blocks = [blocks[i] for i in order]
+        return world
+
+    def content_hash(self):
+        """Get a hex digest of the world bounds and obstacles that is stable across processes.
+        The blocks and the drones that are not selected are included, i.e. everything the selected
+        drone moves around, so worlds that only differ by the selected drone location share a hash.
+        """
+        digest = hashlib.sha1()
+        digest.update(repr((self.x_min, self.x_max, self.y_min, self.y_max, self.z_min, self.z_max)).encode())
+        selected = self._drone.state() if self._drone else None
+        for state in sorted(self.state()):
+            if state != selected:
+                digest.update(struct.pack("<B3i", *state))
+        return digest.hexdigest()
 
     def actions(self):
         """Get all the actions for the drone.
@@ -139,4 +652,23 @@ class DroneWorld(object):
         return self._drone.actions()
 
     def __eq__(self, other):
-        return self._drone == other._drone and self._blocks == other._blocks
\ No newline at end of file
+        return self._drones == other._drones and self._blocks == other._blocks
+
+    def __getstate__(self):
+        """Pickle (and copy) the world without its distance fields, chunk graphs, jump grids and
+         component indexes, which are built again when they are first needed. The copy has no
+         consumers of its obstacle changes yet, so the change log is left out as well.
+        """
+        state = self.__dict__.copy()
+        state["_distance_fields"] = OrderedDict()
+        state["_chunk_graphs"] = {}
+        state["_jump_grids"] = {}
+        state["_component_indexes"] = {}
+        state["_obstacle_changes"] = []
+        state["_change_offset"] = self._change_offset + len(self._obstacle_changes)
+        del state["_change_cursors"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._change_cursors = weakref.WeakKeyDictionary()
\ No newline at end of file
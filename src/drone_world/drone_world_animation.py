@@ -0,0 +1,160 @@
+import copy
+import time
+import subprocess
+import numpy as np
+from matplotlib import pyplot as plt
+from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+from drone_world_figure import DroneWorldFigure
+from drone_world_object import DroneWorldObjectId, DroneWorldAction
+
+class DroneWorldAnimation(DroneWorldFigure):
+    def __init__(self, world, timelines, headless=False, frame_step=1):
+        """Playback of the action timelines of the drones of a world.
+         world is the world the timelines start from and is not modified. Each timeline is the list
+         of actions of a drone (by drone index) at every time step, i.e. (dx, dy, dz) moves,
+         DroneWorldAction.WAIT, ATTACH and RELEASE, like TowerPlanner.log. Every frame_step time
+         steps make a frame. The objects that are not carried are drawn once into a background and
+         every frame only draws the drones and the blocks they carry on top of it.
+        """
+        self.timelines = timelines
+        self.frame_step = frame_step
+        self._replay(world)
+        super(DroneWorldAnimation, self).__init__(world, headless)
+
+        # Artists of the drones and moved blocks, updated in place for every frame
+        self._drone_artists = [self._add_cube(location, DroneWorldObjectId.DRONE) for location in self.frames[0][0]]
+        self._block_artists = dict((index, self._add_cube(self.frames[0][1][index], self._moved[index]))
+                                   for index in self._moved)
+        locations = [location for drones, blocks, _ in self.frames for location in drones + blocks.values()]
+        self._fit(np.array([state[1:] for state in world.state()] + locations))
+        self._background = None
+        self._carried = None
+
+    def _replay(self, world):
+        """Apply the timelines to a copy of world and record the frames.
+        Every frame holds the drone locations, the locations of the moved blocks (by state() index)
+        and the set of carried blocks.
+        """
+        scratch = copy.deepcopy(world)
+        carried = {}
+        locations = {}
+        self._moved = {}
+        self.frames = []
+        length = max(len(timeline) for timeline in self.timelines) if self.timelines else 0
+        for t in range(length + 1):
+            drones = scratch.get_drone_locations()
+            for drone, block in carried.items():
+                x, y, z = drones[drone]
+                locations[block] = x, y - 1, z
+            if t % self.frame_step == 0 or t == length:
+                self.frames.append((drones, dict(locations), set(carried.values())))
+            if t == length:
+                break
+
+            for drone, timeline in enumerate(self.timelines):
+                if t >= len(timeline) or timeline[t] == DroneWorldAction.WAIT:
+                    continue
+                scratch.select_drone(drone)
+                if timeline[t] == DroneWorldAction.ATTACH:
+                    scratch.attach()
+                    location = scratch.get_attached_block_location()
+                    for index, state in enumerate(scratch.state()):
+                        if state[1:] == location:
+                            carried[drone] = index
+                            self._moved[index] = state[0]
+                elif timeline[t] == DroneWorldAction.RELEASE:
+                    index = carried.pop(drone)
+                    scratch.release()
+                    locations[index] = tuple(scratch.state()[index][1:])
+                elif scratch.execute_plan([timeline[t]]) is not None:
+                    raise RuntimeError("Drone {} cannot apply {} at time step {}".format(drone, timeline[t], t))
+
+        # Blocks are at their initial location until they are moved
+        states = world.state()
+        for _, blocks, _ in self.frames:
+            for index in self._moved:
+                if index not in blocks:
+                    blocks[index] = tuple(states[index][1:])
+
+    def _draw_blocks(self):
+        # Moved blocks and drones are drawn as their own artists
+        states = self.world.state()
+        self._draw_states([state for index, state in enumerate(states)
+                           if index not in self._moved and state[0] != DroneWorldObjectId.DRONE])
+
+    def _add_cube(self, location, obj_id):
+        collection = Poly3DCollection(DroneWorldFigure._cube(location), facecolors=DroneWorldObjectId.id_to_str(obj_id),
+                                      linewidths=.5, edgecolors='black', alpha=.25)
+        self.ax.add_collection3d(collection)
+        return collection
+
+    def _draw_frame(self, frame):
+        """Draw a frame on the canvas.
+        The background (every object but the drones and the carried blocks) is only drawn again
+        when the carried blocks change.
+        """
+        drones, blocks, carried = frame
+        canvas = self.fig.canvas
+        for artist, location in zip(self._drone_artists, drones):
+            artist.set_verts(DroneWorldFigure._cube(location))
+        for index, location in blocks.items():
+            self._block_artists[index].set_verts(DroneWorldFigure._cube(location))
+
+        moving = self._drone_artists + [self._block_artists[index] for index in carried]
+        if self._background is None or carried != self._carried:
+            for artist in moving:
+                artist.set_visible(False)
+            canvas.draw()
+            self._background = canvas.copy_from_bbox(self.fig.bbox)
+            self._carried = carried
+            for artist in moving:
+                artist.set_visible(True)
+
+        canvas.restore_region(self._background)
+        renderer = canvas.get_renderer()
+        for artist in moving:
+            artist.do_3d_projection(renderer)
+            self.ax.draw_artist(artist)
+
+    def _images(self):
+        """Generate the (height, width, 3) RGB image of every frame.
+        """
+        width, height = self.fig.canvas.get_width_height()
+        for frame in self.frames:
+            self._draw_frame(frame)
+            image = np.frombuffer(self.fig.canvas.buffer_rgba(), dtype=np.uint8).reshape(height, width, 4)
+            yield image[:, :, :3].copy()
+
+    def play(self, interval=0.05):
+        """Play the animation in a window.
+        """
+        plt.show(block=False)
+        for frame in self.frames:
+            self._draw_frame(frame)
+            self.fig.canvas.blit(self.fig.bbox)
+            self.fig.canvas.flush_events()
+            time.sleep(interval)
+
+    def save(self, filename, fps=10):
+        """Write the animation to a GIF (with Pillow) or a video file (with ffmpeg).
+        """
+        images = self._images()
+        if filename.lower().endswith(".gif"):
+            from PIL import Image
+            first = Image.fromarray(next(images))
+            first.save(filename, save_all=True, append_images=(Image.fromarray(image) for image in images),
+                       duration=int(1000 / fps), loop=0)
+            return
+
+        width, height = self.fig.canvas.get_width_height()
+        command = ["ffmpeg", "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24",
+                   "-s", "{}x{}".format(width, height), "-r", str(fps), "-i", "-", "-pix_fmt", "yuv420p", filename]
+        try:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        except OSError:
+            raise RuntimeError("ffmpeg is required to write {}".format(filename))
+        for image in images:
+            process.stdin.write(image.tostring())
+        process.stdin.close()
+        if process.wait() != 0:
+            raise RuntimeError("ffmpeg cannot write {}".format(filename))
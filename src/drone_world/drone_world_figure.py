@@ -1,57 +1,104 @@
 from drone_world import DroneWorld
-from drone_world_object import DroneWorldObjectId
+from drone_world_object import DroneWorldObjectId, DroneWorldAction
 from matplotlib import pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 import numpy as np
 
 class DroneWorldFigure(object):
-    def __init__(self, world):
+    # Corners of the face of a unit cube towards each of the DroneWorldAction.MOVES directions
+    FACES = np.array([
+        [[1, 0, 0], [1, 1, 0], [1, 1, 1], [1, 0, 1]],
+        [[0, 0, 0], [0, 1, 0], [0, 1, 1], [0, 0, 1]],
+        [[0, 1, 0], [1, 1, 0], [1, 1, 1], [0, 1, 1]],
+        [[0, 0, 0], [1, 0, 0], [1, 0, 1], [0, 0, 1]],
+        [[0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]],
+        [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]],
+    ])
+
+    def __init__(self, world, headless=False):
+        """Figure of the objects of a drone world.
+         Every color is drawn as a single mesh without the faces shared by adjacent objects. If
+         headless is set, the figure is not attached to a window and can only be saved to a file.
+        """
         if not isinstance(world, DroneWorld):
             raise TypeError("World must be a DroneWorld object")
         self.world = world
-        self.fig = plt.figure()
+        if headless:
+            self.fig = Figure()
+            FigureCanvasAgg(self.fig)
+        else:
+            self.fig = plt.figure()
         self.ax = self.fig.add_subplot(111, projection='3d')
         self.ax.set_xlabel("X")
         self.ax.set_ylabel("Y")
         self.ax.set_zlabel("Z")
         self._draw_blocks()
 
+    def _keys(self, locations):
+        """Get a unique integer of each (x, y, z) location, including locations just outside the world.
+        """
+        size_y = self.world.y_max - self.world.y_min + 3
+        size_z = self.world.z_max - self.world.z_min + 3
+        x = locations[:, 0] - self.world.x_min + 1
+        y = locations[:, 1] - self.world.y_min + 1
+        z = locations[:, 2] - self.world.z_min + 1
+        return (x * size_y + y) * size_z + z
+
+    @staticmethod
+    def _cube(location):
+        """Get the faces of the unit cube at the (x, y, z) location with y and z swapped for drawing.
+        """
+        return (np.array(location) + DroneWorldFigure.FACES)[:, :, [0, 2, 1]]
+
     def _draw_blocks(self):
-        for state in self.world.state():
-            obj_id, x, y, z = state
+        self._draw_states(self.world.state())
+
+    def _draw_states(self, states):
+        """Draw the (id, x, y, z) states as one mesh per color and fit the axis limits to them.
+        """
+        states = np.array(states, dtype=np.int64).reshape(-1, 4)
+        if not len(states):
+            return
+        ids, locations = states[:, 0], states[:, 1:]
+        keys = self._keys(locations)
+
+        # Keep the faces that do not touch another object
+        quads = []
+        quad_ids = []
+        for move, face in zip(DroneWorldAction.MOVES, DroneWorldFigure.FACES):
+            visible = ~np.in1d(self._keys(locations + move), keys)
+            quads.append(locations[visible][:, None, :] + face)
+            quad_ids.append(ids[visible])
+        quads = np.concatenate(quads)
+        quad_ids = np.concatenate(quad_ids)
+
+        # Need to swap y and z values
+        quads = quads[:, :, [0, 2, 1]]
+
+        for obj_id in np.unique(quad_ids):
             color = DroneWorldObjectId.id_to_str(obj_id)
+            self.ax.add_collection3d(Poly3DCollection(quads[quad_ids == obj_id], facecolors=color, linewidths=.5,
+                                                      edgecolors='black', alpha=.25))
 
-            # Need to swap y and z values
-            tmp = y
-            y = z
-            z = tmp
-
-            # vertices of a cube
-            v = np.array(
-                [[x, y, z],
-                 [x, y, z + 1],
-                 [x, y + 1, z],
-                 [x, y + 1, z + 1],
-                 [x + 1, y, z],
-                 [x + 1, y, z + 1],
-                 [x + 1, y + 1, z],
-                 [x + 1, y + 1, z + 1]]
-            )
-            self.ax.scatter3D(v[:, 0], v[:, 1], v[:, 2])
-
-            # generate list of sides' polygons of our pyramid
-            verts = [
-                [v[0], v[2], v[3], v[1]],
-                [v[0], v[4], v[5], v[1]],
-                [v[4], v[6], v[7], v[5]],
-                [v[6], v[2], v[3], v[7]],
-                [v[0], v[4], v[6], v[2]],
-                [v[1], v[5], v[7], v[3]]
-            ]
-
-            # plot sides
-            self.ax.add_collection3d(Poly3DCollection(verts, facecolors=color, linewidths=1, edgecolors='black', alpha=.25))
+        self._fit(locations)
         return
 
+    def _fit(self, locations):
+        """Fit the axis limits to a (n, 3) array of (x, y, z) locations.
+        Collections do not update the axis limits.
+        """
+        low = locations.min(axis=0)
+        high = locations.max(axis=0) + 1
+        self.ax.set_xlim(low[0], high[0])
+        self.ax.set_ylim(low[2], high[2])
+        self.ax.set_zlim(low[1], high[1])
+
     def show(self):
-        plt.show()
\ No newline at end of file
+        plt.show()
+
+    def save(self, filename, dpi=100):
+        """Render the figure to an image file, e.g. a PNG.
+        """
+        self.fig.savefig(filename, dpi=dpi)
\ No newline at end of file
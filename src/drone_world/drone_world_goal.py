@@ -1,15 +1,31 @@
 import math
-import copy
 import time
+import multiprocessing
 from drone_world import DroneWorld
-from drone_world_object import DroneWorldObjectId
+from drone_world_object import DroneWorldObjectId, DroneWorldAction
 from search.node import Node
 from search.tabu import TabuSearch
 from search.simulated_annealing import SimulatedAnnealingSearch
-
-class TowerPlannerSimulateAnnealing(object):
-    def __init__(self, x, y, z, world):
+from search.a_star import AStarSearch
+from search.portfolio import PortfolioSearch, PortfolioPool
+from search.hierarchical import HierarchicalSearch
+from search.jump_point import JumpPointSearch
+from search.search_status import SearchStatus
+from instrumentation import Instrumentation
+
+class TowerPlanner(object):
+    def __init__(self, x, y, z, world, use_distance_field=False, colors=None, path_cache=None, deadline=None,
+                 max_expansions=None):
         """Construct a tower at the given (x, y, z) location.
+         Subclasses must implement search() which runs a search from a goal Node. If
+         use_distance_field is set, search nodes use the obstacle aware distance as heuristic. If
+         colors is a mask of DroneWorldObjectId values (e.g. RED | BLUE), only blocks of those
+         colors are picked up. If path_cache is a PathCache of the world, cached paths are used
+         instead of searching and new paths are added to it. Every search stops after deadline
+         seconds or max_expansions expanded nodes (if set). A partial path is executed and planned
+         again from where it ends. Once the drone cannot get any closer to a block, the column of
+         the block is skipped for the rest of the build, and once a carried block cannot be
+         brought any closer to the tower, it is released and its column skipped.
         """
         if not isinstance(world, DroneWorld):
             raise TypeError("World object must be of type DroneWorld")
@@ -21,169 +37,258 @@ class TowerPlannerSimulateAnnealing(object):
         self.start_time = None
         self.end_time = None
         self.moves = 0
+        self.iterations = 0
+        self.use_distance_field = use_distance_field
+        self.colors = colors
+        self.path_cache = path_cache
+        self.deadline = deadline
+        self.max_expansions = max_expansions
+
+        # Number of searches that reached a limit before the goal and the (x, z) columns skipped
+        # because of them
+        self.partial_searches = 0
+        self.skipped_columns = set()
+
+        # Actions applied to the world, including DroneWorldAction.ATTACH and RELEASE
+        self.log = []
 
     @property
     def runtime(self):
         return self.end_time - self.start_time
 
-    def generate_attach_goal(self):
-        states = self.world.state()
-        for state in states:
-            obj_id, x, y, z = state
-            if obj_id == DroneWorldObjectId.DRONE or x == self.goal_x and z == self.goal_z:
+    def generate_attach_goal(self, skipped=()):
+        """Get the location above the uncovered block nearest to the drone around obstacles.
+        Columns are visited in increasing straight line distance, which never overestimates the
+        number of moves, so the visit stops once no closer column is left. Blocks of the (x, z)
+        columns in skipped are not picked.
+        """
+        drone_x, drone_y, drone_z = self.world.get_drone_location()
+        field = self.world.get_distance_field(drone_x, drone_y, drone_z)
+        goal = None
+        goal_distance = None
+        for column_distance, x, z in self.world.get_nearest_columns(drone_x, drone_z):
+            if goal_distance is not None and column_distance >= goal_distance:
+                break
+            if (x == self.goal_x and z == self.goal_z) or (x, z) in skipped:
                 continue
-            else:
-                if not self.world.verify_world_bounds(x, y + 1, z):
-                    raise RuntimeError("Goal position cannot be achieved")
-                return x, y + 1, z
+
+            # Hover above the highest block of the column
+            y = self.world.get_column_height(x, z)
+            if self.colors is not None and not self.world.get_object(x, y, z).id & self.colors:
+                continue
+            y += 1
+            if not self.world.verify_world_bounds(x, y, z) or not self.world.is_reachable(x, y, z):
+                continue
+            distance = field.distance(x, y, z)
+            if distance is not None and (goal_distance is None or distance < goal_distance):
+                goal = x, y, z
+                goal_distance = distance
+        if goal is None:
+            raise RuntimeError("Goal position cannot be achieved")
+        return goal
 
     def generate_release_goal(self):
-        if not self.world.verify_world_bounds(self.goal_x, self.height + 2, self.goal_z):
+        # The drone hovers above the attached block which is above the top of the tower
+        y = self.world.get_column_height(self.goal_x, self.goal_z) + 2
+        if not self.world.verify_world_bounds(self.goal_x, y + 1, self.goal_z):
             raise RuntimeError("Goal position cannot be achieved")
-        return self.goal_x, self.height + 1, self.goal_z
+        return self.goal_x, y, self.goal_z
+
+    def search(self, goal_node):
+        """Run a search from goal_node with the deadline and max_expansions limits and return the
+         (solution Node, SearchStatus).
+         Implementations add the number of search iterations to self.iterations.
+        """
+        raise NotImplementedError("Tower planner must implement search()")
+
+    def plan(self, x, y, z):
+        """Get the (list of actions, SearchStatus) that move the drone to the (x, y, z) goal.
+        If the search reaches a limit first, the actions move the drone closer to the goal. If the
+        goal is not reachable, no actions are returned.
+        """
+        start = self.world.get_drone_location()
+        carrying = self.world.get_attached_block_location() is not None
+        if not self.world.is_reachable(x, y, z):
+            return [], SearchStatus.UNREACHABLE
+        if self.path_cache is not None:
+            actions = self.path_cache.get(start, (x, y, z), carrying)
+            if actions is not None:
+                return actions, SearchStatus.GOAL_MET
+        goal_node = DroneWorldGoal.generate_search_node(x, y, z, self.world, self.use_distance_field)
+        solution, status = self.search(goal_node)
+        actions = solution.get_actions()
+        if status != SearchStatus.GOAL_MET:
+            self.partial_searches += 1
+            if Instrumentation.enabled:
+                Instrumentation.count("TowerPlanner.partial_search")
+        elif self.path_cache is not None:
+            self.path_cache.put(start, (x, y, z), carrying, actions)
+        return actions, status
+
+    def execute_actions(self, actions):
+        """Apply the actions of a plan to the world.
+        """
+        failed = self.world.execute_plan(actions)
+        if failed is not None:
+            raise RuntimeError("Action {} {} of the plan cannot be executed".format(failed, actions[failed]))
+        self.moves += len(actions)
+        self.log.extend(actions)
 
     def run(self):
         self.start_time = time.time()
         while self.height != self.goal_y:
-
-            # Generate an attach goal
-            x, y, z = self.generate_attach_goal()
-            attach_goal_node = DroneWorldGoal.generate_search_node(x, y, z, self.world)
-
-            # Run simulate annealing search
-            simulate_annealing = SimulatedAnnealingSearch(attach_goal_node, 1000.0, 0.01)
-            solution = simulate_annealing.run()
+            phase_start_time = time.time()
+
+            # Generate an attach goal and plan the path to it. Partial paths move the drone closer to
+            # the goal, so they are executed and the rest of the path is planned again. Blocks the
+            # drone cannot get any closer to are skipped until no block is left.
+            while True:
+                x, y, z = self.generate_attach_goal(self.skipped_columns)
+                actions, status = self.plan(x, y, z)
+                while status != SearchStatus.GOAL_MET and actions:
+                    self.execute_actions(actions)
+                    actions, status = self.plan(x, y, z)
+                if status == SearchStatus.GOAL_MET:
+                    break
+                self.skipped_columns.add((x, z))
 
             # Update drone world with results
-            actions = solution.get_actions()
-            for action in actions:
-                x, y, z = action
-                self.world.move(x, y, z)
-            self.moves += len(actions)
+            self.execute_actions(actions)
 
             # Attach to the block
             self.world.attach()
+            self.log.append(DroneWorldAction.ATTACH)
+            if Instrumentation.enabled:
+                Instrumentation.complete("TowerPlanner.attach", phase_start_time, height=self.height, moves=len(actions))
+            phase_start_time = time.time()
 
-            # Generate goal to release the block
+            # Generate goal to release the block and plan the path to it. Partial paths move the drone
+            # closer to the goal, so they are executed and the rest of the path is planned again.
             x, y, z = self.generate_release_goal()
-            release_goal_node = DroneWorldGoal.generate_search_node(x, y, z, self.world)
-
-            # Run Tabu search
-            simulate_annealing = SimulatedAnnealingSearch(release_goal_node, 1000.0, 0.01)
-            solution = simulate_annealing.run()
+            actions, status = self.plan(x, y, z)
+            while status != SearchStatus.GOAL_MET and actions:
+                self.execute_actions(actions)
+                actions, status = self.plan(x, y, z)
 
             # Update drone world with results
-            actions = solution.get_actions()
-            for action in actions:
-                x, y, z = action
-                self.world.move(x, y, z)
-            self.moves += len(actions)
+            self.execute_actions(actions)
 
             # Release the block
+            block_x, _, block_z = self.world.get_attached_block_location()
             self.world.release()
-
-            # Increment stack height
-            self.height += 1
+            self.log.append(DroneWorldAction.RELEASE)
+            if Instrumentation.enabled:
+                Instrumentation.complete("TowerPlanner.release", phase_start_time, height=self.height, moves=len(actions),
+                                         status=status)
+
+            # Increment stack height, unless the block was dropped on the way and its column is skipped
+            if block_x == self.goal_x and block_z == self.goal_z:
+                self.height += 1
+            else:
+                self.skipped_columns.add((block_x, block_z))
 
         # Exit
         self.end_time = time.time()
+        if Instrumentation.enabled:
+            Instrumentation.complete("TowerPlanner.run", self.start_time, moves=self.moves)
         return
 
-class TowerPlannerTabu(object):
-    def __init__(self, x, y, z, world):
+class StochasticTowerPlanner(TowerPlanner):
+    # (search class, search arguments after the init node) of the planner, set by subclasses
+    ENGINE = None
+
+    def __init__(self, x, y, z, world, chains=1, **kwargs):
         """Construct a tower at the given (x, y, z) location.
+         If chains is greater than one, every search runs that many seeded chains of the search in
+         a PortfolioSearch, and the searches of a run share one PortfolioPool. Other keyword
+         arguments are passed to TowerPlanner.
         """
-        if not isinstance(world, DroneWorld):
-            raise TypeError("World object must be of type DroneWorld")
-        self.goal_x = x
-        self.goal_y = y
-        self.goal_z = z
-        self.height = 0
-        self.world = world
-        self.start_time = None
-        self.end_time = None
-        self.moves = 0
-
-    @property
-    def runtime(self):
-        return self.end_time - self.start_time
+        super(StochasticTowerPlanner, self).__init__(x, y, z, world, **kwargs)
+        self.chains = chains
+        self.pool = None
 
-    def generate_attach_goal(self):
-        states = self.world.state()
-        for state in states:
-            obj_id, x, y, z = state
-            if obj_id == DroneWorldObjectId.DRONE or x == self.goal_x and z == self.goal_z:
-                continue
-            else:
-                if not self.world.verify_world_bounds(x, y + 1, z):
-                    raise RuntimeError("Goal position cannot be achieved")
-                return x, y + 1, z
-
-    def generate_release_goal(self):
-        if not self.world.verify_world_bounds(self.goal_x, self.height + 2, self.goal_z):
-            raise RuntimeError("Goal position cannot be achieved")
-        return self.goal_x, self.height + 1, self.goal_z
+    def search(self, goal_node):
+        """Run the search, either once or as a portfolio of chains.
+        """
+        if self.chains > 1:
+            if self.pool is None:
+                self.pool = PortfolioPool(min(self.chains, multiprocessing.cpu_count()))
+            search = PortfolioSearch(goal_node, [self.ENGINE] * self.chains, self.deadline,
+                                     max_expansions=self.max_expansions, pool=self.pool)
+        else:
+            engine, args = self.ENGINE
+            search = engine(goal_node, *args, deadline=self.deadline, max_expansions=self.max_expansions)
+        solution = search.run()
+        self.iterations += search.iterations
+        return solution, search.status
 
     def run(self):
-        self.start_time = time.time()
-        while self.height != self.goal_y:
-
-            # Generate an attach goal
-            x, y, z = self.generate_attach_goal()
-            attach_goal_node = DroneWorldGoal.generate_search_node(x, y, z, self.world)
-
-            # Run Tabu search
-            tabu = TabuSearch(attach_goal_node, 5)
-            solution = tabu.run()
-
-            # Update drone world with results
-            actions = solution.get_actions()
-            for action in actions:
-                x, y, z = action
-                self.world.move(x, y, z)
-            self.moves += len(actions)
-
-            # Attach to the block
-            self.world.attach()
-
-            # Generate goal to release the block
-            x, y, z = self.generate_release_goal()
-            release_goal_node = DroneWorldGoal.generate_search_node(x, y, z, self.world)
-
-            # Run Tabu search
-            tabu = TabuSearch(release_goal_node, 5)
-            solution = tabu.run()
-
-            # Update drone world with results
-            actions = solution.get_actions()
-            for action in actions:
-                x, y, z = action
-                self.world.move(x, y, z)
-            self.moves += len(actions)
-
-            # Release the block
-            self.world.release()
+        try:
+            super(StochasticTowerPlanner, self).run()
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool = None
+
+class TowerPlannerSimulateAnnealing(StochasticTowerPlanner):
+    ENGINE = SimulatedAnnealingSearch, (1000.0, 0.01)
+
+class TowerPlannerTabu(StochasticTowerPlanner):
+    ENGINE = TabuSearch, (5,)
+
+class TowerPlannerAStar(TowerPlanner):
+    def search(self, goal_node):
+        """Run A* search.
+        """
+        a_star = AStarSearch(goal_node, self.max_expansions, self.deadline)
+        solution = a_star.run()
+        self.iterations += a_star.iterations
+        return solution, a_star.status
 
-            # Increment stack height
-            self.height += 1
+class TowerPlannerHierarchical(TowerPlanner):
+    def __init__(self, x, y, z, world, chunk_size=8, **kwargs):
+        """Construct a tower at the given (x, y, z) location.
+         Paths are planned over chunk_size x chunk_size x chunk_size chunks of the world first and
+         then refined inside the chunks around them, so they can be longer than the paths of
+         TowerPlannerAStar. Other keyword arguments are passed to TowerPlanner.
+        """
+        super(TowerPlannerHierarchical, self).__init__(x, y, z, world, **kwargs)
+        self.chunk_size = chunk_size
 
-        # Exit
-        self.end_time = time.time()
-        return
+    def search(self, goal_node):
+        """Run hierarchical search.
+        """
+        hierarchical = HierarchicalSearch(goal_node, self.chunk_size, self.deadline, self.max_expansions)
+        solution = hierarchical.run()
+        self.iterations += hierarchical.iterations
+        return solution, hierarchical.status
+
+class TowerPlannerJumpPoint(TowerPlanner):
+    def search(self, goal_node):
+        """Run jump point search.
+        """
+        jump_point = JumpPointSearch(goal_node, self.deadline, self.max_expansions)
+        solution = jump_point.run()
+        self.iterations += jump_point.iterations
+        return solution, jump_point.status
 
 
 class DroneWorldGoal(object):
     @staticmethod
-    def generate_search_node(goal_x, goal_y, goal_z, world):
+    def generate_search_node(goal_x, goal_y, goal_z, world, use_distance_field=False):
         """Generate a Node based of the world and a (x, y, z) location.
-        Note that world will be copied meaning that the reference provided will not be updated.
+        Note that world is shared (not copied) by every node of the search. The search only reads
+        from the world, so the world must not be modified until the search is complete. A goal the
+        drone cannot reach is rejected before any search.
         """
         if not isinstance(world, DroneWorld):
             raise TypeError("World object must be of type DroneWorld")
-        world_copy = DroneWorldGoal(goal_x, goal_y, goal_z, copy.deepcopy(world))
-        return Node(world_copy , None, None, 0)
+        if not world.is_reachable(goal_x, goal_y, goal_z):
+            raise RuntimeError("Goal position cannot be achieved")
+        goal = DroneWorldGoal(goal_x, goal_y, goal_z, world, use_distance_field)
+        return Node(goal, None, None, 0)
 
-    def __init__(self, goal_x, goal_y, goal_z, drone_world):
+    def __init__(self, goal_x, goal_y, goal_z, drone_world, use_distance_field=False):
         self.goal_x = goal_x
         self.goal_y = goal_y
         self.goal_z = goal_z
@@ -192,26 +297,60 @@ class DroneWorldGoal(object):
         # Set the current drone location
         self.drone_x, self.drone_y, self.drone_z = self.drone_world.get_drone_location()
 
+        # Set the current attached block location (None if the drone is not carrying a block)
+        self.block_location = self.drone_world.get_attached_block_location()
+
+        # Distances to the goal around obstacles, shared by every state of the search
+        self.distance_field = None
+        if use_distance_field:
+            self.distance_field = self.drone_world.get_distance_field(goal_x, goal_y, goal_z)
+
     def actions(self):
-        """Get a list of (x, y, z) locations from the drone world
+        """Get a list of (dx, dy, dz) actions for the drone from the drone world.
+        The drone world is not modified, the drone and attached block locations of this state are
+        checked against the world instead.
         """
-        return self.drone_world.actions()
+        mask = self.drone_world.get_action_mask((self.drone_x, self.drone_y, self.drone_z), self.block_location)
+        return DroneWorldAction.mask_to_actions(mask)
 
     def apply_action(self, action):
-        """Apply the action to the drone world.
+        """Apply the action to the drone (and attached block) location of this state.
         """
         dx, dy, dz = action
-        self.drone_world.move(dx, dy, dz)
-        self.drone_x, self.drone_y, self.drone_z = self.drone_world.get_drone_location()
+        self.drone_x += dx
+        self.drone_y += dy
+        self.drone_z += dz
+        if self.block_location:
+            block_x, block_y, block_z = self.block_location
+            self.block_location = block_x + dx, block_y + dy, block_z + dz
 
     def h(self):
         """Base cost on the distance between the drone and the goal
+        With a distance field, the number of moves around obstacles is used unless the goal cannot
+        be reached from the drone.
         """
+        if self.distance_field:
+            distance = self.distance_field.distance(self.drone_x, self.drone_y, self.drone_z)
+            if distance is not None:
+                return distance
         distance = math.pow(self.goal_x - self.drone_x, 2)
         distance += math.pow(self.goal_y - self.drone_y, 2)
         distance += math.pow(self.goal_z - self.drone_z, 2)
         return math.sqrt(distance)
 
+    def distance(self):
+        """Manhattan distance between the drone and the goal.
+        Every action moves the drone by one along a single axis, so this never overestimates the
+        number of actions left.
+        """
+        return abs(self.goal_x - self.drone_x) + abs(self.goal_y - self.drone_y) + abs(self.goal_z - self.drone_z)
+
+    def key(self):
+        """Hashable key of the state.
+        The attached block is always directly below the drone, so the drone location is enough.
+        """
+        return self.drone_x, self.drone_y, self.drone_z
+
     def is_goal_met(self):
         """If drone location is goal location, return true.
         """
@@ -221,4 +360,7 @@ class DroneWorldGoal(object):
         if isinstance(other, DroneWorldGoal):
             return self.drone_x == other.drone_x and self.drone_y == other.drone_y and self.drone_z == other.drone_z
         else:
-            raise TypeError("Object must by of type DroneWorldGoal")
\ No newline at end of file
+            raise TypeError("Object must by of type DroneWorldGoal")
+
+    def __hash__(self):
+        return hash(self.key())
\ No newline at end of file
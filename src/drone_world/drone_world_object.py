@@ -42,6 +42,22 @@ class DroneWorldObjectId(object):
         else:
             raise ValueError("Unsupported drone world object type: {}".format(obj_id))
 
+class DroneWorldAction(object):
+    # All (dx, dy, dz) moves of the drone. Bit i of an action mask is set when MOVES[i] is legal.
+    MOVES = [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1)]
+    BITS = dict((move, 1 << i) for i, move in enumerate(MOVES))
+
+    # Actions of a drone in a plan log besides the MOVES
+    WAIT = 0, 0, 0
+    ATTACH = "attach"
+    RELEASE = "release"
+
+    @staticmethod
+    def mask_to_actions(mask):
+        """Return the list of (dx, dy, dz) actions set in an action mask.
+        """
+        return [move for i, move in enumerate(DroneWorldAction.MOVES) if mask >> i & 1]
+
 class DroneWorldObject(object):
     def __init__(self, world, x, y, z, object_id):
         self.x = x
@@ -58,9 +74,11 @@ class DroneWorldObject(object):
         new_y = self.y + dy
         new_z = self.z + dz
         if self._world.can_move_object(new_x, new_y, new_z):
+            old_location = self.location()
             self.x = new_x
             self.y = new_y
             self.z = new_z
+            self._world.update_object_location(self, old_location)
             return True
         return False
 
@@ -0,0 +1,96 @@
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+
+class Instrumentation(object):
+    """Counters and timed spans of the drone world and searches.
+    Instrumentation is off by default, so callers check Instrumentation.enabled before recording.
+    Setting the DRONE_WORLD_TRACE environment variable to a filename turns it on at import and
+    writes a Chrome trace-event file and a summary (to stderr) when the process exits.
+    """
+    enabled = False
+    counters = {}
+    events = []
+
+    @staticmethod
+    def enable():
+        Instrumentation.enabled = True
+
+    @staticmethod
+    def disable():
+        Instrumentation.enabled = False
+
+    @staticmethod
+    def reset():
+        """Clear all the counters and events.
+        """
+        Instrumentation.counters = {}
+        Instrumentation.events = []
+
+    @staticmethod
+    def count(name, value=1):
+        """Add value to the name counter.
+        """
+        Instrumentation.counters[name] = Instrumentation.counters.get(name, 0) + value
+
+    @staticmethod
+    def complete(name, start_time, **args):
+        """Record a span from start_time (as returned by time.time()) until now.
+        """
+        end_time = time.time()
+        Instrumentation.events.append({
+            "name": name,
+            "ph": "X",
+            "ts": start_time * 1e6,
+            "dur": (end_time - start_time) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.current_thread().ident,
+            "args": args,
+        })
+
+    @staticmethod
+    def export_chrome_trace(filename):
+        """Write the spans and the final counter values as a Chrome trace-event JSON file.
+        The file can be opened with chrome://tracing or Perfetto.
+        """
+        events = list(Instrumentation.events)
+        if Instrumentation.counters:
+            events.append({
+                "name": "counters",
+                "ph": "C",
+                "ts": time.time() * 1e6,
+                "pid": os.getpid(),
+                "args": Instrumentation.counters,
+            })
+        with open(filename, "w") as trace_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
+
+    @staticmethod
+    def summary():
+        """Return a table of the counters and the count, total and mean duration of each span.
+        """
+        lines = ["{:<40} {:>12}".format("counter", "value")]
+        for name in sorted(Instrumentation.counters):
+            lines.append("{:<40} {:>12}".format(name, Instrumentation.counters[name]))
+
+        spans = {}
+        for event in Instrumentation.events:
+            count, total = spans.get(event["name"], (0, 0.0))
+            spans[event["name"]] = count + 1, total + event["dur"] / 1e6
+        lines.append("")
+        lines.append("{:<40} {:>12} {:>12} {:>12}".format("span", "count", "total (s)", "mean (ms)"))
+        for name in sorted(spans):
+            count, total = spans[name]
+            lines.append("{:<40} {:>12} {:>12.3f} {:>12.3f}".format(name, count, total, 1000.0 * total / count))
+        return "\n".join(lines)
+
+def _export_at_exit(filename):
+    Instrumentation.export_chrome_trace(filename)
+    sys.stderr.write(Instrumentation.summary() + "\n")
+
+if os.environ.get("DRONE_WORLD_TRACE"):
+    Instrumentation.enable()
+    atexit.register(_export_at_exit, os.environ["DRONE_WORLD_TRACE"])
@@ -0,0 +1,126 @@
+import bisect
+
+class JumpGrid(object):
+    # Order of the (x, y, z) axes in grid coordinates. Lines along the last axis (y) are columns.
+    AXES = 0, 2, 1
+
+    def __init__(self, world, carrying=False):
+        """Sparse index of the obstacles of a drone world for jump point search.
+         Locations are in grid coordinates, i.e. (x, z, y). Obstacles are indexed by the line along
+         the last axis they are on, and lines by the plane along the first axis they are on, so a
+         search can skip the lines and planes without obstacles. If carrying is set, a location is
+         free only if both the drone and the block below it fit. sync() applies the obstacle
+         changes of the world since the grid was created.
+        """
+        self.world = world
+        self.carrying = carrying
+        low = [world.x_min, world.y_min, world.z_min]
+        high = [world.x_max, world.y_max, world.z_max]
+        obstacles = world.get_obstacle_locations()
+        if carrying:
+            # The drone cannot be above an obstacle or the bottom of the world
+            low[1] += 1
+            obstacles = obstacles + [(x, y + 1, z) for x, y, z in obstacles]
+        self.low = self.to_grid(low)
+        self.high = self.to_grid(high)
+
+        # Set of obstacle locations inside the bounds
+        self.obstacles = set()
+        for location in obstacles:
+            location = self.to_grid(location)
+            if self.in_bounds(location):
+                self.obstacles.add(location)
+
+        # Map of (c0, c1) lines to the sorted c2 values of their obstacles
+        self.lines = {}
+        for c0, c1, c2 in self.obstacles:
+            self.lines.setdefault((c0, c1), []).append(c2)
+        for values in self.lines.values():
+            values.sort()
+
+        # Map of c0 planes to the sorted c1 values of their lines with obstacles
+        self.planes = {}
+        for c0, c1 in self.lines:
+            self.planes.setdefault(c0, []).append(c1)
+        for values in self.planes.values():
+            values.sort()
+
+        # Sorted c0 values of the planes with obstacles
+        self.plane_keys = sorted(self.planes)
+
+        # World version the grid is up to date with, later obstacle changes are read from the world
+        self._version = world.version
+        world.track_obstacle_changes(self)
+
+    @staticmethod
+    def to_grid(location):
+        return tuple(location[axis] for axis in JumpGrid.AXES)
+
+    @staticmethod
+    def from_grid(location):
+        world_location = [0, 0, 0]
+        for value, axis in zip(location, JumpGrid.AXES):
+            world_location[axis] = value
+        return tuple(world_location)
+
+    def sync(self):
+        """Update the locations with obstacle changes since the last sync.
+        """
+        if self._version == self.world.version:
+            return
+        can_move_drone = self.world.can_move_drone
+        for x, y, z in self.world.get_obstacle_changes(self):
+            if self.carrying:
+                # The location is the block location of the drone location above it
+                updates = [((x, y, z), can_move_drone(x, y, z) and can_move_drone(x, y - 1, z)),
+                           ((x, y + 1, z), can_move_drone(x, y + 1, z) and can_move_drone(x, y, z))]
+            else:
+                updates = [((x, y, z), can_move_drone(x, y, z))]
+            for location, free in updates:
+                location = self.to_grid(location)
+                if self.in_bounds(location):
+                    self._set_obstacle(location, not free)
+        self._version = self.world.version
+
+    def _set_obstacle(self, location, blocked):
+        if blocked == (location in self.obstacles):
+            return
+        c0, c1, c2 = location
+        if blocked:
+            self.obstacles.add(location)
+            line = self.lines.setdefault((c0, c1), [])
+            if not line:
+                plane = self.planes.setdefault(c0, [])
+                if not plane:
+                    bisect.insort(self.plane_keys, c0)
+                bisect.insort(plane, c1)
+            bisect.insort(line, c2)
+        else:
+            self.obstacles.remove(location)
+            line = self.lines[(c0, c1)]
+            line.remove(c2)
+            if not line:
+                del self.lines[(c0, c1)]
+                plane = self.planes[c0]
+                plane.remove(c1)
+                if not plane:
+                    del self.planes[c0]
+                    self.plane_keys.remove(c0)
+
+    def in_bounds(self, location):
+        low, high = self.low, self.high
+        return low[0] <= location[0] <= high[0] and low[1] <= location[1] <= high[1] and \
+            low[2] <= location[2] <= high[2]
+
+    def is_free(self, location):
+        return self.in_bounds(location) and location not in self.obstacles
+
+    @staticmethod
+    def next_value(values, start, step):
+        """Get the first of the sorted values from start on in the direction of step, or None.
+        """
+        if step > 0:
+            index = bisect.bisect_left(values, start)
+            return values[index] if index < len(values) else None
+        index = bisect.bisect_right(values, start)
+        return values[index - 1] if index else None
@@ -0,0 +1,149 @@
+import os
+import json
+from collections import OrderedDict
+from instrumentation import Instrumentation
+
+class PathCache(object):
+    # Version of the path cache file format
+    FILE_VERSION = 1
+
+    def __init__(self, world, capacity=1024, filename=None):
+        """LRU cache of the drone actions from a start to a goal location, with or without a block.
+         A cached path stays valid until an obstacle changes in its corridor, i.e. the locations the
+         drone (and the carried block) pass through. If filename is set, paths are also stored by
+         the content hash of the world they were found in. They are loaded from the file if it
+         exists and written by save(), so a run on the same world can skip the searches.
+        """
+        if capacity <= 0:
+            raise ValueError("Path cache capacity must be greater than zero")
+        self.world = world
+        self.capacity = capacity
+        self.filename = filename
+        self.hits = 0
+        self.misses = 0
+
+        # Map of (start, goal, carrying) keys to (actions, corridor), least recently used first
+        self._entries = OrderedDict()
+
+        # Map of locations to the keys of the entries whose corridor includes the location
+        self._corridors = {}
+
+        # World version the corridors are checked up to, later obstacle changes are read from the world
+        self._version = world.version
+        world.track_obstacle_changes(self)
+
+        # Map of (world content hash, start, goal, carrying) to actions of the stored paths
+        self._stored = {}
+
+        # World version and content hash of the last content_hash() call
+        self._hash_version = None
+        self._hash = None
+        if filename and os.path.exists(filename):
+            self.load()
+
+    @staticmethod
+    def corridor(start, actions, carrying):
+        """Get the set of locations the drone (and the block below it if carrying) pass through.
+        """
+        x, y, z = start
+        corridor = set([(x, y, z)])
+        if carrying:
+            corridor.add((x, y - 1, z))
+        for dx, dy, dz in actions:
+            x, y, z = x + dx, y + dy, z + dz
+            corridor.add((x, y, z))
+            if carrying:
+                corridor.add((x, y - 1, z))
+        return corridor
+
+    def _content_hash(self):
+        """Get the content hash of the world, computed once per world version.
+        """
+        if self._hash_version != self.world.version:
+            self._hash = self.world.content_hash()
+            self._hash_version = self.world.version
+        return self._hash
+
+    def _remove(self, key):
+        _, corridor = self._entries.pop(key)
+        for location in corridor:
+            keys = self._corridors[location]
+            keys.discard(key)
+            if not keys:
+                del self._corridors[location]
+
+    def _sync(self):
+        """Invalidate the entries whose corridor includes an obstacle change since the last sync.
+        """
+        if self._version == self.world.version:
+            return
+        for location in self.world.get_obstacle_changes(self):
+            for key in list(self._corridors.get(location, ())):
+                self._remove(key)
+                if Instrumentation.enabled:
+                    Instrumentation.count("PathCache.invalidate")
+        self._version = self.world.version
+
+    def get(self, start, goal, carrying):
+        """Get the list of actions from start to goal or None if no valid path is cached.
+        """
+        self._sync()
+        key = start, goal, carrying
+        entry = self._entries.pop(key, None)
+        if entry is None and self._stored:
+            actions = self._stored.get((self._content_hash(),) + key)
+            if actions is not None:
+                entry = actions, PathCache.corridor(start, actions, carrying)
+                for location in entry[1]:
+                    self._corridors.setdefault(location, set()).add(key)
+        if entry is None:
+            self.misses += 1
+            if Instrumentation.enabled:
+                Instrumentation.count("PathCache.miss")
+            return None
+        self._entries[key] = entry
+        self.hits += 1
+        if Instrumentation.enabled:
+            Instrumentation.count("PathCache.hit")
+        return list(entry[0])
+
+    def put(self, start, goal, carrying, actions):
+        """Cache the list of actions from start to goal, found in the current world.
+        """
+        self._sync()
+        key = start, goal, carrying
+        if key in self._entries:
+            self._remove(key)
+        actions = [tuple(action) for action in actions]
+        corridor = PathCache.corridor(start, actions, carrying)
+        self._entries[key] = actions, corridor
+        for location in corridor:
+            self._corridors.setdefault(location, set()).add(key)
+        while len(self._entries) > self.capacity:
+            self._remove(next(iter(self._entries)))
+        if self.filename:
+            self._stored[(self._content_hash(),) + key] = actions
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self):
+        """Load the stored paths from the cache file.
+        """
+        with open(self.filename, "r") as cache_file:
+            data = json.load(cache_file)
+        if data.get("version") != PathCache.FILE_VERSION:
+            raise ValueError("Unsupported path cache file: {}".format(self.filename))
+        for content_hash, start, goal, carrying, actions in data["paths"]:
+            key = content_hash, tuple(start), tuple(goal), carrying
+            self._stored[key] = [tuple(action) for action in actions]
+
+    def save(self):
+        """Write the stored paths to the cache file.
+        """
+        if not self.filename:
+            raise RuntimeError("Path cache does not have a filename")
+        paths = [[content_hash, start, goal, carrying, actions]
+                 for (content_hash, start, goal, carrying), actions in self._stored.items()]
+        with open(self.filename, "w") as cache_file:
+            json.dump({"version": PathCache.FILE_VERSION, "paths": paths}, cache_file)
@@ -0,0 +1,75 @@
+import heapq
+import itertools
+import time
+from node import Node
+from search_status import SearchStatus
+from ..instrumentation import Instrumentation
+
+class AStarSearch(object):
+    def __init__(self, init_node, max_expansions=None, deadline=None):
+        """Initialize the A* search.
+         Note that the state of init_node must implement key(), a hashable key of the state, and
+         distance(), an admissible estimate of the number of actions left to reach the goal. The
+         search stops after max_expansions expanded nodes or deadline seconds (if set) and returns
+         the expanded node closest to the goal, see SearchStatus.
+        """
+        if not isinstance(init_node, Node):
+            raise ValueError("init_node must be a Node object")
+        if max_expansions is not None and max_expansions <= 0:
+            raise ValueError("max_expansions must be greater than zero")
+        if deadline is not None and deadline <= 0:
+            raise ValueError("Deadline must be greater than zero")
+        self.init_node = init_node
+        self.max_expansions = max_expansions
+        self.deadline = deadline
+        self.iterations = 0
+        self.status = None
+
+    def run(self):
+        """Run an A* search.
+         Every action costs 1, so the returned Node has the fewest actions that meet the goal.
+        """
+
+        start_time = time.time()
+        end_time = SearchStatus.end_time(start_time, self.deadline)
+
+        # Open list is a heap of (f, h, counter, node); ties on f prefer the node closest to the goal
+        # and the counter keeps nodes from being compared
+        counter = itertools.count()
+        h = self.init_node.state.distance()
+        open_list = [(h, h, next(counter), self.init_node)]
+        g_scores = {self.init_node.state.key(): 0}
+        closed = set()
+        closest = None
+
+        while open_list:
+            _, h, _, node = heapq.heappop(open_list)
+            key = node.state.key()
+            if key in closed:
+                continue
+            if closest is None or h < closest[0]:
+                closest = h, node
+            self.status = SearchStatus.GOAL_MET if node.is_goal_met() else \
+                SearchStatus.limit(self.iterations, self.max_expansions, end_time)
+            if self.status:
+                # Stop with the solution, or the node closest to the goal once a limit is reached
+                if self.status != SearchStatus.GOAL_MET:
+                    node = closest[1]
+                if Instrumentation.enabled:
+                    Instrumentation.complete("AStarSearch.run", start_time, iterations=self.iterations, status=self.status)
+                return node
+            closed.add(key)
+
+            # Up the iteration counter
+            self.iterations += 1
+
+            g = g_scores[key] + 1
+            for neighbor in node.expand():
+                neighbor_key = neighbor.state.key()
+                if neighbor_key in closed or g >= g_scores.get(neighbor_key, g + 1):
+                    continue
+                g_scores[neighbor_key] = g
+                h = neighbor.state.distance()
+                heapq.heappush(open_list, (g + h, h, next(counter), neighbor))
+
+        raise RuntimeError("Goal position cannot be achieved")
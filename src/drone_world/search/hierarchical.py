@@ -0,0 +1,51 @@
+import time
+from node import Node
+from search_status import SearchStatus
+from ..instrumentation import Instrumentation
+
+class HierarchicalSearch(object):
+    def __init__(self, init_node, chunk_size=8, deadline=None, max_expansions=None):
+        """Initialize the hierarchical (HPA*) search.
+         Note that the state of init_node must be a DroneWorldGoal. The path is found on the
+         ChunkGraph of its world, which is shared by every search on that world, so the chunks
+         are only computed again after their obstacles change. The path is the shortest one inside
+         the chunks around the route over the chunks, which is not always the shortest path of the
+         world (see ChunkGraph.find_path()). The search stops after deadline seconds or
+         max_expansions expanded transitions (if set) and returns the path to the transition
+         closest to the goal, see SearchStatus. iterations counts the expanded transitions and
+         locations, not the searches that compute the chunks.
+        """
+        if not isinstance(init_node, Node):
+            raise ValueError("init_node must be a Node object")
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be greater than zero")
+        if deadline is not None and deadline <= 0:
+            raise ValueError("Deadline must be greater than zero")
+        if max_expansions is not None and max_expansions <= 0:
+            raise ValueError("max_expansions must be greater than zero")
+        self.init_node = init_node
+        self.chunk_size = chunk_size
+        self.deadline = deadline
+        self.max_expansions = max_expansions
+        self.iterations = 0
+        self.status = None
+
+    def run(self):
+        """Run a hierarchical search over the chunks of the world and refine the route inside the
+         chunks around it. Return the solution Node.
+        """
+        start_time = time.time()
+        state = self.init_node.state
+        carrying = state.block_location is not None
+        graph = state.drone_world.get_chunk_graph(self.chunk_size, carrying)
+        iterations = graph.iterations
+        path, self.status = graph.find_path((state.drone_x, state.drone_y, state.drone_z),
+                                            (state.goal_x, state.goal_y, state.goal_z),
+                                            SearchStatus.end_time(start_time, self.deadline), self.max_expansions)
+        self.iterations = graph.iterations - iterations
+        if Instrumentation.enabled:
+            Instrumentation.complete("HierarchicalSearch.run", start_time, iterations=self.iterations, status=self.status)
+        if path is None:
+            raise RuntimeError("Goal position cannot be achieved")
+        actions = [(b[0] - a[0], b[1] - a[1], b[2] - a[2]) for a, b in zip(path, path[1:])]
+        return Node.replay(self.init_node, actions)
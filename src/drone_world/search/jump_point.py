@@ -0,0 +1,231 @@
+import heapq
+import itertools
+import time
+from node import Node
+from search_status import SearchStatus
+from ..jump_grid import JumpGrid
+from ..instrumentation import Instrumentation
+
+class JumpPointSearch(object):
+    def __init__(self, init_node, deadline=None, max_expansions=None):
+        """Initialize the jump point search.
+         Note that the state of init_node must be a DroneWorldGoal. Every move costs 1, so the
+         search only expands the jump points of the canonical shortest paths, i.e. the locations
+         where a path has to turn, and jumps over the straight runs between them. The search stops
+         after deadline seconds or max_expansions expanded jump points (if set) and returns the
+         path to the jump point closest to the goal, see SearchStatus.
+        """
+        if not isinstance(init_node, Node):
+            raise ValueError("init_node must be a Node object")
+        if deadline is not None and deadline <= 0:
+            raise ValueError("Deadline must be greater than zero")
+        if max_expansions is not None and max_expansions <= 0:
+            raise ValueError("max_expansions must be greater than zero")
+        self.init_node = init_node
+        self.deadline = deadline
+        self.max_expansions = max_expansions
+        self.iterations = 0
+        self.status = None
+        self.grid = None
+        self.goal = None
+
+        # Map of c0 planes to the sorted c1 values of the lines with obstacles in the plane or the
+        # planes next to it
+        self._neighbor_lines = {}
+
+    def _jump_line(self, location, step):
+        """Jump from location along the last axis, the direction with the lowest priority.
+        Return the first jump point or None if the run ends at an obstacle or the world bounds.
+        """
+        c0, c1, c2 = location
+        grid = self.grid
+        end = grid.high[2] if step > 0 else grid.low[2]
+        obstacle = JumpGrid.next_value(grid.lines.get((c0, c1), ()), c2 + step, step)
+        if obstacle is not None:
+            end = obstacle - step
+        if (end - c2) * step <= 0:
+            return None
+        stop = None
+        goal = self.goal
+        if goal[0] == c0 and goal[1] == c1 and 0 < (goal[2] - c2) * step <= (end - c2) * step:
+            stop = goal[2]
+
+        # A neighbor is forced where a neighbor line is free right after one of its obstacles
+        for neighbor in ((c0 + 1, c1), (c0 - 1, c1), (c0, c1 + 1), (c0, c1 - 1)):
+            values = grid.lines.get(neighbor)
+            if not values:
+                continue
+            value = JumpGrid.next_value(values, c2, step)
+            while value is not None and (value + step - c2) * step <= (end - c2) * step and \
+                    (stop is None or (value + step - stop) * step < 0):
+                if (neighbor[0], neighbor[1], value + step) not in grid.obstacles:
+                    stop = value + step
+                    break
+                value = JumpGrid.next_value(values, value + step, step)
+        if stop is None:
+            return None
+        return c0, c1, stop
+
+    def _next_location(self, current, step, end, values, goal_value):
+        """Get the first value from current on in the direction of step that is next to one of the
+         sorted values or is goal_value (if not None). Return None if there is none up to end.
+        """
+        nearest = goal_value if goal_value is not None and (goal_value - current) * step >= 0 else None
+        value = JumpGrid.next_value(values, current - step, step)
+        if value is not None:
+            value = value - step if (value - step - current) * step > 0 else current
+            if nearest is None or (value - nearest) * step < 0:
+                nearest = value
+        if nearest is None or (end - nearest) * step < 0:
+            return None
+        return nearest
+
+    def _jump_plane(self, location, step):
+        """Jump from location along the middle axis.
+        Locations whose neighbor lines have no obstacles are skipped, since no line jump from them
+        can stop and none of their neighbors are forced.
+        """
+        c0, c1, c2 = location
+        grid = self.grid
+        end = grid.high[1] if step > 0 else grid.low[1]
+        values = self._neighbor_lines.get(c0)
+        if values is None:
+            values = sorted(set(value for plane in (c0 - 1, c0, c0 + 1) for value in grid.planes.get(plane, ())))
+            self._neighbor_lines[c0] = values
+        goal_value = self.goal[1] if self.goal[0] == c0 else None
+        current = c1 + step
+        while True:
+            current = self._next_location(current, step, end, values, goal_value)
+            if current is None:
+                return None
+            location = c0, current, c2
+            if location in grid.obstacles:
+                return None
+            if location == self.goal:
+                return location
+            for sign in (1, -1):
+                if grid.is_free((c0 + sign, current, c2)) and not grid.is_free((c0 + sign, current - step, c2)):
+                    return location
+            if self._jump_line(location, 1) or self._jump_line(location, -1):
+                return location
+            current += step
+
+    def _jump_space(self, location, step):
+        """Jump from location along the first axis, the direction with the highest priority.
+        Planes without obstacles next to them are skipped.
+        """
+        c0, c1, c2 = location
+        grid = self.grid
+        end = grid.high[0] if step > 0 else grid.low[0]
+        current = c0 + step
+        while True:
+            current = self._next_location(current, step, end, grid.plane_keys, self.goal[0])
+            if current is None:
+                return None
+            location = current, c1, c2
+            if location in grid.obstacles:
+                return None
+            if location == self.goal:
+                return location
+            if self._jump_plane(location, 1) or self._jump_plane(location, -1) or \
+                    self._jump_line(location, 1) or self._jump_line(location, -1):
+                return location
+            current += step
+
+    def _successors(self, location, direction):
+        """Get the (axis, step) directions to jump to from a jump point reached in direction.
+        Directions with a lower priority than direction are natural successors, the ones with a
+        higher priority are only followed if an obstacle forces them.
+        """
+        if direction is None:
+            return [(axis, step) for axis in range(3) for step in (1, -1)]
+        axis, step = direction
+        successors = [direction] + [(other, sign) for other in range(axis + 1, 3) for sign in (1, -1)]
+        previous = list(location)
+        previous[axis] -= step
+        for other in range(axis):
+            for sign in (1, -1):
+                neighbor = list(location)
+                neighbor[other] += sign
+                blocked = list(previous)
+                blocked[other] += sign
+                if self.grid.is_free(tuple(neighbor)) and not self.grid.is_free(tuple(blocked)):
+                    successors.append((other, sign))
+        return successors
+
+    def run(self):
+        """Run a jump point search.
+         Return the solution Node, with one unit (dx, dy, dz) action per move.
+        """
+        start_time = time.time()
+        end_time = SearchStatus.end_time(start_time, self.deadline)
+        state = self.init_node.state
+        carrying = state.block_location is not None
+        self.grid = state.drone_world.get_jump_grid(carrying)
+        self.goal = JumpGrid.to_grid((state.goal_x, state.goal_y, state.goal_z))
+        start = JumpGrid.to_grid((state.drone_x, state.drone_y, state.drone_z))
+        jumps = self._jump_space, self._jump_plane, self._jump_line
+
+        def h(location):
+            return abs(self.goal[0] - location[0]) + abs(self.goal[1] - location[1]) + abs(self.goal[2] - location[2])
+
+        # Nodes are (location, direction) as the successors of a jump point depend on the direction
+        # it is reached in. Ties on f are broken towards the larger g (stored negated), i.e. the jump
+        # points closer to the goal.
+        counter = itertools.count()
+        open_list = [(h(start), 0, next(counter), (start, None))]
+        g_scores = {(start, None): 0}
+        parents = {(start, None): None}
+        closed = set()
+        closest = None
+        path = None
+        while open_list:
+            _, g, _, node = heapq.heappop(open_list)
+            g = -g
+            if node in closed:
+                continue
+            location, direction = node
+            if closest is None or h(location) < closest[0]:
+                closest = h(location), node
+            self.status = SearchStatus.GOAL_MET if location == self.goal else \
+                SearchStatus.limit(self.iterations, self.max_expansions, end_time)
+            if self.status:
+                # Stop with the solution, or the jump point closest to the goal once a limit is reached
+                if self.status != SearchStatus.GOAL_MET:
+                    node = closest[1]
+                path = []
+                while node:
+                    path.append(node[0])
+                    node = parents[node]
+                path.reverse()
+                break
+            closed.add(node)
+            self.iterations += 1
+
+            for axis, step in self._successors(location, direction):
+                jump_point = jumps[axis](location, step)
+                if jump_point is None:
+                    continue
+                neighbor = jump_point, (axis, step)
+                cost = g + abs(jump_point[axis] - location[axis])
+                if neighbor in closed or cost >= g_scores.get(neighbor, cost + 1):
+                    continue
+                g_scores[neighbor] = cost
+                parents[neighbor] = node
+                heapq.heappush(open_list, (cost + h(jump_point), -cost, next(counter), neighbor))
+
+        if Instrumentation.enabled:
+            Instrumentation.complete("JumpPointSearch.run", start_time, iterations=self.iterations, status=self.status)
+        if path is None:
+            raise RuntimeError("Goal position cannot be achieved")
+
+        # Expand the jumps into unit moves
+        actions = []
+        for previous, following in zip(path, path[1:]):
+            delta = [following[axis] - previous[axis] for axis in range(3)]
+            for axis in range(3):
+                if delta[axis]:
+                    unit = [0, 0, 0]
+                    unit[axis] = 1 if delta[axis] > 0 else -1
+                    actions.extend([JumpGrid.from_grid(unit)] * abs(delta[axis]))
+        return Node.replay(self.init_node, actions)
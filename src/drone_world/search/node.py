@@ -1,4 +1,5 @@
 import copy
+from ..instrumentation import Instrumentation
 
 class Node(object):
     def __init__(self, state, action, parent, node_count):
@@ -13,14 +14,32 @@ class Node(object):
 
     def expand(self):
         """Expand the current node returning the neighbors of the node.
+        Note that the state is shallow copied, so apply_action() must not modify objects shared
+        between states.
         """
+        if Instrumentation.enabled:
+            Instrumentation.count("Node.expand")
+        actions = self.state.actions()
+        if Instrumentation.enabled:
+            Instrumentation.count("Node.state_copy", len(actions))
         nodes = []
-        for action in self.state.actions():
-            state = copy.deepcopy(self.state)
+        for action in actions:
+            state = copy.copy(self.state)
             state.apply_action(action)
             nodes.append(Node(state, action, self, self.node_count))
         return nodes
 
+    @staticmethod
+    def replay(init_node, actions):
+        """Rebuild the solution Node by applying the actions to init_node.
+        """
+        node = init_node
+        for action in actions:
+            state = copy.copy(node.state)
+            state.apply_action(action)
+            node = Node(state, action, node, node.node_count)
+        return node
+
     def get_actions(self):
         """Return a list of actions.
         """
@@ -38,6 +57,15 @@ class Node(object):
         """
         return self.state.is_goal_met()
 
+    def key(self):
+        """Return a hashable key of the state.
+        Note that key() must be defined by the state object.
+        """
+        return self.state.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
     def __eq__(self, other):
         """If the state of two nodes are the same, then the nodes are equal.
         Note that the state object probably wants to override the __eq__() operator.
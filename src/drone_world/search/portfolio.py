@@ -0,0 +1,150 @@
+import cPickle
+import random
+import time
+import multiprocessing
+from node import Node
+from search_status import SearchStatus
+from ..instrumentation import Instrumentation
+
+# Shared current run of the pool and the (run, initial node) of the last chain, set in every
+# worker process
+_worker_current_run = None
+_worker_init_node = None
+
+def _init_worker(current_run):
+    global _worker_current_run
+    _worker_current_run = current_run
+
+def _run_chain(chain):
+    """Run a seeded search chain in a worker process.
+    Return its index, actions, iterations, status and the fitness of its solution.
+    """
+    global _worker_init_node
+    run, init_data, index, engine, args, seed, deadline, max_expansions = chain
+
+    # The initial node is unpickled once for all the chains of a run this worker gets
+    if _worker_init_node is None or _worker_init_node[0] != run:
+        _worker_init_node = run, cPickle.loads(init_data)
+    SearchStatus.cancel_when(_worker_current_run, run)
+    random.seed(seed)
+    search = engine(_worker_init_node[1], *args, deadline=deadline, max_expansions=max_expansions)
+    solution = search.run()
+    return index, solution.get_actions(), search.iterations, search.status, solution.fitness
+
+class PortfolioPool(object):
+    def __init__(self, processes=None):
+        """Process pool that runs the chains of successive portfolios.
+         The worker processes are started on the first run and reused by the later runs, which
+         send their initial node along with their chains. Chains still running when their run is
+         finished are cancelled, see SearchStatus.CANCELLED. close() stops the workers.
+        """
+        self.processes = processes or multiprocessing.cpu_count()
+        self._pool = None
+        self._current_run = multiprocessing.RawValue("i", 0)
+
+    def imap_unordered(self, init_node, chains):
+        """Start the (index, engine, args, seed, deadline, max_expansions) chains from init_node and
+         return an iterator of their results in completion order.
+        """
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(self.processes, initializer=_init_worker,
+                                              initargs=(self._current_run,))
+        run = self._current_run.value
+        init_data = cPickle.dumps(init_node, cPickle.HIGHEST_PROTOCOL)
+        return self._pool.imap_unordered(_run_chain, [(run, init_data) + chain for chain in chains])
+
+    def finish(self):
+        """Cancel the chains of the current run that are still running.
+        """
+        self._current_run.value += 1
+
+    def close(self):
+        """Stop the worker processes.
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+class PortfolioSearch(object):
+    def __init__(self, init_node, engines, deadline=None, seed=None, processes=None, max_expansions=None, pool=None):
+        """Run several independently seeded searches from init_node in a process pool.
+         engines is a list of (search class, search arguments after the init node) tuples, e.g.
+         [(TabuSearch, (5,)), (SimulatedAnnealingSearch, (1000.0, 0.01))]. Every search gets the
+         deadline (in seconds) and max_expansions limits. Without a deadline, the first solution
+         that meets the goal is returned. With a deadline, the solution with the fewest actions
+         found before the deadline is returned, and the searches still running at the deadline
+         are cancelled and return their best partial solution. If no search meets the goal, the
+         partial solution with the lowest fitness is returned with its SearchStatus. Remaining
+         searches are cancelled. If pool is a PortfolioPool, its workers run the searches,
+         otherwise a pool of processes workers is started for the run.
+        """
+        if not isinstance(init_node, Node):
+            raise ValueError("init_node must be a Node object")
+        if not engines:
+            raise ValueError("Portfolio must have at least one search engine")
+        if deadline is not None and deadline <= 0:
+            raise ValueError("Deadline must be greater than zero")
+        if max_expansions is not None and max_expansions <= 0:
+            raise ValueError("max_expansions must be greater than zero")
+        self.init_node = init_node
+        self.engines = engines
+        self.deadline = deadline
+        self.max_expansions = max_expansions
+        self.processes = processes or min(len(engines), multiprocessing.cpu_count())
+        self.pool = pool
+        if seed is None:
+            self.seeds = [random.getrandbits(32) for _ in engines]
+        else:
+            self.seeds = [seed + i for i in range(len(engines))]
+        self.iterations = 0
+        self.winner = None
+        self.status = None
+
+    def run(self):
+        """Run the portfolio and return the solution Node.
+        """
+        start_time = time.time()
+        chains = [(i, engine, args, seed, self.deadline, self.max_expansions)
+                  for i, ((engine, args), seed) in enumerate(zip(self.engines, self.seeds))]
+        end_time = SearchStatus.end_time(start_time, self.deadline)
+        pool = self.pool or PortfolioPool(self.processes)
+        best = None
+        try:
+            results = pool.imap_unordered(self.init_node, chains)
+            pending = len(chains)
+            while pending:
+                try:
+                    result = results.next(None if end_time is None else max(end_time - time.time(), 0))
+                except multiprocessing.TimeoutError:
+                    # Chains that started late are still running at the deadline. Once cancelled, they
+                    # return their best partial solution right away.
+                    pool.finish()
+                    end_time = None
+                    continue
+                pending -= 1
+                if best is None or PortfolioSearch._rank(result) < PortfolioSearch._rank(best):
+                    best = result
+                if self.deadline is None and result[3] == SearchStatus.GOAL_MET:
+                    break
+        finally:
+            pool.finish()
+            if pool is not self.pool:
+                pool.close()
+
+        self.winner, actions, self.iterations, self.status, _ = best
+        if self.status == SearchStatus.CANCELLED:
+            self.status = SearchStatus.DEADLINE
+        if Instrumentation.enabled:
+            Instrumentation.complete("PortfolioSearch.run", start_time, iterations=self.iterations, winner=self.winner,
+                                     status=self.status)
+        return Node.replay(self.init_node, actions)
+
+    @staticmethod
+    def _rank(result):
+        """Sort key of a chain result, solutions that meet the goal first and then the shortest.
+        """
+        _, actions, _, status, fitness = result
+        if status == SearchStatus.GOAL_MET:
+            return 0, len(actions)
+        return 1, fitness
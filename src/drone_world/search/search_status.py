@@ -0,0 +1,50 @@
+import time
+
+class SearchStatus(object):
+    # The solution meets the goal
+    GOAL_MET = "goal_met"
+
+    # The deadline passed first, the solution is the best partial solution found
+    DEADLINE = "deadline"
+
+    # The node budget ran out first, the solution is the best partial solution found
+    BUDGET = "budget"
+
+    # The goal is not connected to the start, no search is run
+    UNREACHABLE = "unreachable"
+
+    # The portfolio the search runs in is over, the solution is discarded
+    CANCELLED = "cancelled"
+
+    # Shared value holding the current portfolio run and the run the searches of this process
+    # belong to, see cancel_when()
+    _current_run = None
+    _run = None
+
+    @staticmethod
+    def limit(iterations, max_expansions, end_time):
+        """Get the status of a search that reached its node budget or end time, or None.
+        """
+        if max_expansions is not None and iterations >= max_expansions:
+            return SearchStatus.BUDGET
+        if end_time is not None and time.time() >= end_time:
+            return SearchStatus.DEADLINE
+        if SearchStatus._current_run is not None and SearchStatus._current_run.value != SearchStatus._run:
+            return SearchStatus.CANCELLED
+        return None
+
+    @staticmethod
+    def cancel_when(current_run, run):
+        """Stop the searches of this process once the shared current_run value (a
+         multiprocessing.RawValue) is no longer run.
+        """
+        SearchStatus._current_run = current_run
+        SearchStatus._run = run
+
+    @staticmethod
+    def end_time(start_time, deadline):
+        """Get the time a search started at start_time must stop at, or None without a deadline.
+        """
+        if deadline is None:
+            return None
+        return start_time + deadline
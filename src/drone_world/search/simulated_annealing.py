@@ -1,17 +1,34 @@
 import random
 import math
+import time
 from node import Node
+from search_status import SearchStatus
+from ..instrumentation import Instrumentation
 
 class SimulatedAnnealingSearch(object):
-    def __init__(self, init_node, temp, rate):
+    def __init__(self, init_node, temp, rate, deadline=None, max_expansions=None):
+        """Initialize the simulated annealing search.
+         The search stops after deadline seconds or max_expansions expanded nodes (if set) and
+         returns the node with the lowest fitness visited, see SearchStatus.
+        """
         if not isinstance(init_node, Node):
             raise ValueError("init_node must be a Node object")
         if rate >= 1.0:
             raise ValueError("Temperature cannot increase (rate must be less than 1)")
+        if deadline is not None and deadline <= 0:
+            raise ValueError("Deadline must be greater than zero")
+        if max_expansions is not None and max_expansions <= 0:
+            raise ValueError("max_expansions must be greater than zero")
         self.best = init_node
         self.temp = float(temp)
         self.rate = float(rate)
+        self.deadline = deadline
+        self.max_expansions = max_expansions
         self.iterations = 0
+        self.status = None
+
+        # Node with the lowest fitness visited, returned if a limit is reached
+        self.lowest = init_node
 
     def acceptance_probability(self, cur_energy, new_energy):
         if new_energy < cur_energy:
@@ -23,9 +40,19 @@ class SimulatedAnnealingSearch(object):
                 return math.exp(-(float(new_energy - cur_energy) / self.temp))
 
     def run(self):
+        start_time = time.time()
+        end_time = SearchStatus.end_time(start_time, self.deadline)
+        self.status = SearchStatus.GOAL_MET
 
         # Only run until the goal is met
         while not self.best.is_goal_met():
+            # Stop with the best partial solution once a limit is reached
+            status = SearchStatus.limit(self.iterations, self.max_expansions, end_time)
+            if status:
+                self.status = status
+                self.best = self.lowest
+                break
+
             # Increment the iteration counter
             self.iterations += 1
 
@@ -43,7 +70,13 @@ class SimulatedAnnealingSearch(object):
                 # Check to see if the random neighbor should be accepted
                 if self.acceptance_probability(self.best.fitness, neighbor.fitness) >= random.uniform(0, 1):
                     self.best = neighbor
+                    if neighbor < self.lowest:
+                        self.lowest = neighbor
                     break
 
+        if Instrumentation.enabled:
+            Instrumentation.complete("SimulatedAnnealingSearch.run", start_time, iterations=self.iterations,
+                                     status=self.status)
+
         # Return the best solution
         return self.best
\ No newline at end of file
@@ -1,42 +1,72 @@
+from collections import deque
+import random
+import time
 from node import Node
+from search_status import SearchStatus
+from ..instrumentation import Instrumentation
 
 class TabuSearch(object):
-    def __init__(self, init_node, short_mem_limit):
+    def __init__(self, init_node, short_mem_limit, deadline=None, max_expansions=None):
+        """Initialize the Tabu search.
+         The search stops after deadline seconds or max_expansions expanded nodes (if set) and
+         returns the best partial solution, see SearchStatus. Neighbors with the same fitness are
+         picked in random order, so searches seeded differently (e.g. the chains of a
+         PortfolioSearch) take different paths.
+        """
         if not isinstance(init_node, Node):
             raise ValueError("init_node must be a Node object")
+        if deadline is not None and deadline <= 0:
+            raise ValueError("Deadline must be greater than zero")
+        if max_expansions is not None and max_expansions <= 0:
+            raise ValueError("max_expansions must be greater than zero")
         self.s_best = init_node
         self.short_mem_limit = short_mem_limit
+        self.deadline = deadline
+        self.max_expansions = max_expansions
         self.iterations = 0
+        self.status = None
 
     def run(self):
         """Run a Tabu search.
          Note that this Tabu search is based on lower cost meaning a lower value is better.
         """
+        start_time = time.time()
+        end_time = SearchStatus.end_time(start_time, self.deadline)
+        self.status = SearchStatus.GOAL_MET
 
         # Set best candidate to the init_node
         best_candidate = self.s_best
 
-        # Setup tabu memory structures
-        tabu_short_term_mem = []
+        # Setup tabu memory structures. The queue holds state keys in visit order and the counts
+        # allow O(1) membership tests as the same key can be in the queue more than once.
+        tabu_short_term_mem = deque()
+        tabu_short_term_counts = {}
 
         # Add init_node to tabu structures
-        tabu_short_term_mem.append(best_candidate)
+        self._tabu_push(tabu_short_term_mem, tabu_short_term_counts, best_candidate.key())
 
         # Loop through until s_best (which is a Node) is successful
         while not self.s_best.is_goal_met():
 
+            # Stop with the best partial solution once a limit is reached
+            status = SearchStatus.limit(self.iterations, self.max_expansions, end_time)
+            if status:
+                self.status = status
+                break
+
             # Up the iteration counters
             self.iterations += 1
 
-            # Get all the neighbors
+            # Get all the neighbors and randomize
             neighbors = best_candidate.expand()
+            random.shuffle(neighbors)
 
             # Change the best_candidate to head of neighbors
             best_candidate = neighbors.pop(0)
 
             # Search through remaining neighbors looking for a better candidate
             for s_candidate in neighbors:
-                if s_candidate not in tabu_short_term_mem and s_candidate < best_candidate:
+                if s_candidate.key() not in tabu_short_term_counts and s_candidate < best_candidate:
                     best_candidate = s_candidate
 
             # Is best_candidate is better than s_best, adjust s_best to best_candidate
@@ -44,11 +74,24 @@ class TabuSearch(object):
                 self.s_best = best_candidate
 
             # Put best_candidate on Tabu list as to not revisit it within a defined limit
-            tabu_short_term_mem.append(best_candidate)
+            self._tabu_push(tabu_short_term_mem, tabu_short_term_counts, best_candidate.key())
 
             # Check to see if values need to be popped of Tabu list
             if len(tabu_short_term_mem) > self.short_mem_limit:
-                tabu_short_term_mem.pop(0)
+                key = tabu_short_term_mem.popleft()
+                tabu_short_term_counts[key] -= 1
+                if not tabu_short_term_counts[key]:
+                    del tabu_short_term_counts[key]
+
+        if Instrumentation.enabled:
+            Instrumentation.complete("TabuSearch.run", start_time, iterations=self.iterations, status=self.status)
 
         # Return the best solution
-        return self.s_best
\ No newline at end of file
+        return self.s_best
+
+    @staticmethod
+    def _tabu_push(tabu_mem, tabu_counts, key):
+        """Add a state key to the tabu memory.
+        """
+        tabu_mem.append(key)
+        tabu_counts[key] = tabu_counts.get(key, 0) + 1
\ No newline at end of file
@@ -0,0 +1,78 @@
+import numpy as np
+from drone_world import DroneWorld
+
+class VoxelDroneWorld(DroneWorld):
+    def __init__(self, x_min=-50, x_max=50, y_min=0, y_max=50, z_min=-50, z_max=50):
+        """Drone world backed by a dense voxel grid of DroneWorldObjectId values.
+        Every (x, y, z) location of the world maps to grid[x - x_min, y - y_min, z - z_min] and
+        free locations hold 0.
+        """
+        super(VoxelDroneWorld, self).__init__(x_min, x_max, y_min, y_max, z_min, z_max)
+        self.grid = np.zeros((x_max - x_min + 1, y_max - y_min + 1, z_max - z_min + 1), dtype=np.uint8)
+
+    def _set_voxel(self, location, obj_id):
+        x, y, z = location
+        self.grid[x - self.x_min, y - self.y_min, z - self.z_min] = obj_id
+
+    def _place_drone(self, x, y, z):
+        """Create the drone at (x, y, z) without any checks.
+        """
+        super(VoxelDroneWorld, self)._place_drone(x, y, z)
+        drone = self._drones[-1]
+        self._set_voxel(drone.location(), drone.id)
+
+    def _place_block(self, x, y, z, obj_id):
+        """Create a block at (x, y, z) without any checks. The block still drops.
+        """
+        super(VoxelDroneWorld, self)._place_block(x, y, z, obj_id)
+        block = self._blocks[-1]
+        self._set_voxel(block.location(), block.id)
+
+    def get_object_id(self, x, y, z):
+        """Get the DroneWorldObjectId at the (x, y, z) location, 0 if the location is free.
+        """
+        if not self.verify_world_bounds(x, y, z):
+            raise ValueError("Location ({}, {}, {}) is outside of the drone world".format(x, y, z))
+        return self.grid[x - self.x_min, y - self.y_min, z - self.z_min]
+
+    def can_move_object(self, new_x, new_y, new_z):
+        """Verify that an object can move to the specified location.
+        """
+        if not self.verify_world_bounds(new_x, new_y, new_z):
+            return False
+        return self.grid[new_x - self.x_min, new_y - self.y_min, new_z - self.z_min] == 0
+
+    def update_object_location(self, world_object, old_location):
+        """Update the occupancy map and voxel grid after an object moved away from old_location.
+        """
+        super(VoxelDroneWorld, self).update_object_location(world_object, old_location)
+        if self._occupied.get(world_object.location()) is world_object:
+            self._set_voxel(old_location, 0)
+            self._set_voxel(world_object.location(), world_object.id)
+
+    def _relocate(self, moves):
+        """Move objects to new locations at once and update the voxel grid.
+        """
+        for world_object, _ in moves:
+            self._set_voxel(world_object.location(), 0)
+        super(VoxelDroneWorld, self)._relocate(moves)
+        for world_object, location in moves:
+            self._set_voxel(location, world_object.id)
+
+    def free_cells(self, y_min, y_max):
+        """Get a (n, 3) array of the free (x, y, z) locations in the slab y_min <= y <= y_max.
+        """
+        if y_min > y_max:
+            raise ValueError("Slab y-min cannot be greater than y-max")
+        y_min = max(y_min, self.y_min)
+        y_max = min(y_max, self.y_max)
+        slab = self.grid[:, y_min - self.y_min:y_max - self.y_min + 1, :]
+        return np.argwhere(slab == 0) + np.array([self.x_min, y_min, self.z_min])
+
+    def column_heights(self):
+        """Get a 2D array indexed by [x - x_min, z - z_min] of the highest occupied y of each column.
+        Columns without any object hold y_min - 1.
+        """
+        occupied = self.grid != 0
+        top = occupied.shape[1] - 1 - np.argmax(occupied[:, ::-1, :], axis=1)
+        return np.where(occupied.any(axis=1), top + self.y_min, self.y_min - 1)
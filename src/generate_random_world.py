@@ -1,17 +1,41 @@
 import argparse
-import random
 import csv
+import numpy
+from drone_world.drone_world import DroneWorld
+
+# Colors of the generated blocks, in the order of their command line counts
+BLOCK_COLORS = ["red", "blue", "green", "yellow"]
+
+# Maximum number of blocks placed (and written) at once
+BLOCK_BATCH_SIZE = 65536
+
+class DroneWorldWriter(object):
+    def __init__(self, world):
+        """Writer adding each row to a drone world instead of a configuration file.
+        """
+        self.world = world
+
+    def writerow(self, row):
+        x, y, z, color = row
+        self.world.add_object(int(x), int(y), int(z), color)
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Generate a random configuration file for drone world.")
     parser.add_argument("--red_blocks", type=int, help="Number of reds block to be generated in the world",
-                        required=True)
+                        required=False, default=0)
     parser.add_argument("--blue_blocks", type=int, help="Number of reds block to be generated in the world",
-                        required=True)
+                        required=False, default=0)
     parser.add_argument("--green_blocks", type=int, help="Number of reds block to be generated in the world",
-                        required=True)
+                        required=False, default=0)
     parser.add_argument("--yellow_blocks", type=int, help="Number of yellow block to be generated in the world",
-                        required=True)
+                        required=False, default=0)
+    parser.add_argument("--density", type=float, help="Fraction of the cells left free by the walls to fill with "
+                        "blocks, split among the colors in proportion to their counts (evenly without counts)",
+                        required=False)
     parser.add_argument("--wall_count", type=int, help="Number of random walls to be generated in the world",
                         required=False, default=0)
     parser.add_argument("--x_min", type=int, help="X-min value of drone world", default=-50, required=False)
@@ -19,119 +43,130 @@ def parse_args():
     parser.add_argument("--y_max", type=int, help="Y-max value of drone world", default=50, required=False)
     parser.add_argument("--z_min", type=int, help="Z-min value of drone world", default=-50, required=False)
     parser.add_argument("--z_max", type=int, help="Z-max value of drone world", default=50, required=False)
+    parser.add_argument("--seed", type=int, help="Random seed of the generated world", required=False)
     parser.add_argument("--filename", type=str, help="Configuration filename", required=True)
+    parser.add_argument("--binary", action="store_true", help="Write a binary snapshot instead of a configuration file",
+                        required=False)
 
     return parser.parse_args()
 
+def _column_cells(xs, zs, bottoms, tops):
+    """Get the x, y and z arrays of the cells from bottoms up to (excluding) tops of each (x, z) column.
+    Cells are ordered column by column from the bottom up, so every cell rests on the one before it.
+    """
+    counts = tops - bottoms
+    starts = numpy.repeat(numpy.cumsum(counts) - counts, counts)
+    ys = numpy.arange(counts.sum()) - starts + numpy.repeat(bottoms, counts)
+    return numpy.repeat(xs, counts), ys, numpy.repeat(zs, counts)
+
+def _write_cells(csv_writer, cells, colors):
+    xs, ys, zs = cells
+    csv_writer.writerows(zip(xs.tolist(), ys.tolist(), zs.tolist(), colors))
+
+def density_counts(density, free_cells, counts):
+    """Get the block count of each color that fills density of the free cells.
+    The blocks are split in proportion to counts, or evenly if every count is zero.
+    """
+    weights = numpy.array(counts, dtype=numpy.float64)
+    if not weights.sum():
+        weights[:] = 1
+    total_blocks = int(round(density * free_cells))
+    color_counts = numpy.floor(total_blocks * weights / weights.sum()).astype(numpy.int64)
+
+    # Give the blocks lost to rounding to the first colors with a weight
+    remainder = total_blocks - color_counts.sum()
+    color_counts[numpy.flatnonzero(weights)[:remainder]] += 1
+    return color_counts.tolist()
+
+def generate_world(csv_writer, args, total_blocks, density=None):
+    """Write the rows of a random drone world to csv_writer.
+     Walls and blocks are always stacked from the ground, so the world is tracked as a height map
+     of its (x, z) columns and the rows are written as each wall or batch of blocks is generated.
+     Crossing walls keep the height of the tallest wall. If density is set, total_blocks and the
+     color counts of args are replaced by density_counts() of the cells the walls leave free. The
+     world is reproducible if args.seed is set. Return the number of blocks of each color.
+    """
+    rng = numpy.random.RandomState(args.seed)
+    heights = numpy.zeros((args.x_max - args.x_min + 1, args.z_max - args.z_min + 1), dtype=numpy.int64)
+
+    # Walls and blocks stay below y-max - 1 so the drone can fly over them
+    max_height = args.y_max - 1
+
+    csv_writer.writerow(["0", "0", "0", "drone"])
+
+    for _ in range(args.wall_count):
+        if rng.randint(2):
+            x1, x2 = rng.randint(args.x_min, args.x_max + 1, size=2)
+            xs = numpy.arange(min(x1, x2), max(x1, x2))
+            zs = numpy.full(len(xs), rng.randint(args.z_min, args.z_max + 1), dtype=numpy.int64)
+        else:
+            z1, z2 = rng.randint(args.z_min, args.z_max + 1, size=2)
+            zs = numpy.arange(min(z1, z2), max(z1, z2))
+            xs = numpy.full(len(zs), rng.randint(args.x_min, args.x_max + 1), dtype=numpy.int64)
+        wall_heights = rng.randint(0, max_height + 1, size=len(xs))
+
+        # Keep the drone column clear
+        wall_heights[(xs == 0) & (zs == 0)] = 0
+
+        columns = xs - args.x_min, zs - args.z_min
+        bottoms = heights[columns]
+        tops = numpy.maximum(bottoms, wall_heights)
+        heights[columns] = tops
+        cells = _column_cells(xs, zs, bottoms, tops)
+        _write_cells(csv_writer, cells, ["black"] * len(cells[0]))
+
+    capacity = max_height - heights
+    if args.x_min <= 0 <= args.x_max and args.z_min <= 0 <= args.z_max:
+        capacity[-args.x_min, -args.z_min] = 0
+    block_counts = [args.red_blocks, args.blue_blocks, args.green_blocks, args.yellow_blocks]
+    if density is not None:
+        block_counts = density_counts(density, capacity.sum(), block_counts)
+        total_blocks = sum(block_counts)
+    if total_blocks > capacity.sum():
+        raise ValueError("Drone world does not have room for {} blocks".format(total_blocks))
+
+    # Shuffle the colors so they are not grouped by location
+    colors = numpy.repeat(numpy.arange(len(BLOCK_COLORS)), block_counts)
+    colors = rng.permutation(colors)
+
+    # Place blocks in batches on random columns that are not full
+    placed = 0
+    while placed < total_blocks:
+        candidates = numpy.flatnonzero(capacity)
+        draws = rng.choice(candidates, size=min(total_blocks - placed, BLOCK_BATCH_SIZE))
+        columns, counts = numpy.unique(draws, return_counts=True)
+        counts = numpy.minimum(counts, capacity.flat[columns])
+        bottoms = heights.flat[columns]
+        heights.flat[columns] = bottoms + counts
+        capacity.flat[columns] -= counts
+
+        xs, zs = numpy.unravel_index(columns, heights.shape)
+        cells = _column_cells(xs + args.x_min, zs + args.z_min, bottoms, bottoms + counts)
+        count = len(cells[0])
+        _write_cells(csv_writer, cells, [BLOCK_COLORS[color] for color in colors[placed:placed + count]])
+        placed += count
+    return block_counts
+
 if __name__ == "__main__":
     args = parse_args()
 
     total_blocks = args.red_blocks + args.blue_blocks + args.green_blocks + args.yellow_blocks
-    if total_blocks == 0:
+    if args.density is not None and not 0 < args.density <= 1:
+        print "Density must be greater than zero and at most one"
+        exit(1)
+    if total_blocks == 0 and args.density is None:
         print "Total blocks cannot be zero"
         exit(1)
 
-    with open(args.filename, "wb") as csv_file:
-        csv_writer = csv.writer(csv_file, delimiter=",")
-        csv_writer.writerow(["0", "0", "0", "drone"])
-
-        wall_locations = []
-        walls = args.wall_count
-        while walls > 0:
-            x1 = random.randint(args.x_min, args.x_max)
-            z1 = random.randint(args.z_min, args.z_max)
-            x2 = random.randint(args.x_min, args.x_max)
-            z2 = random.randint(args.x_min, args.x_max)
-
-            if x1 == 0 and z1 == 0 or x2 == 0 and z1 == 0:
-                continue
-
-            if random.uniform(0,1) > 0.5:
-                while x1 != x2:
-                    for i in range(0, random.randint(0, args.y_max - 1)):
-                        location = None
-                        if x1 < x2:
-                            location = x1, i, z1
-                        else:
-                            location = x2, i, z1
-
-                        if location == (0, 0, 0):
-                            break
-
-                        if location not in wall_locations:
-                            wall_locations.append(location)
-                            if x1 < x2:
-                                csv_writer.writerow([x1, i, z1, "black"])
-                            else:
-                                csv_writer.writerow([x2, i, z1, "black"])
-                        else:
-                            break
-                    if x1 < x2:
-                        x1 += 1
-                    else:
-                        x2 += 1
-            else:
-                while z1 != z2:
-                    for i in range(0, random.randint(0, args.y_max - 1)):
-                        location = None
-                        if z1 < z2:
-                            location = x1, i, z1
-                        else:
-                            location = x1, i, z2
-
-                        if location == (0, 0, 0):
-                            break
-
-                        if location not in wall_locations:
-                            wall_locations.append(location)
-                            if z1 < z2:
-                                csv_writer.writerow([x1, i, z1, "black"])
-                            else:
-                                csv_writer.writerow([x1, i, z2, "black"])
-                        else:
-                            break
-                    if z1 < z2:
-                        z1 += 1
-                    else:
-                        z2 += 1
-            walls -= 1
-
-        locations = []
-        block_count = 0
-        while block_count < total_blocks:
-            x = random.randint(args.x_min, args.x_max)
-            z = random.randint(args.z_min, args.z_max)
-            if x == 0 and z == 0:
-                continue
-            else:
-                for i in range(0, args.y_max - 1):
-                    location = x, i, z
-                    if location in locations or location in wall_locations:
-                        continue
-                    else:
-                        locations.append(location)
-                        block_count += 1
-                        break
-
-        red_count = 0
-        blue_count = 0
-        green_count = 0
-        yellow_count = 0
-
-        while (red_count + blue_count + green_count + yellow_count) != total_blocks:
-            x, y, z = locations.pop(0)
-            if red_count < args.red_blocks:
-                csv_writer.writerow([x, y, z, "red"])
-                red_count += 1
-            elif blue_count < args.blue_blocks:
-                csv_writer.writerow([x, y, z, "blue"])
-                blue_count += 1
-            elif green_count < args.green_blocks:
-                csv_writer.writerow([x, y, z, "green"])
-                green_count += 1
-            elif yellow_count < args.yellow_blocks:
-                csv_writer.writerow([x, y, z, "yellow"])
-                yellow_count += 1
+    if args.binary:
+        world = DroneWorld(x_min=args.x_min, x_max=args.x_max, y_max=args.y_max, z_min=args.z_min, z_max=args.z_max)
+        block_counts = generate_world(DroneWorldWriter(world), args, total_blocks, args.density)
+        world.save(args.filename)
+    else:
+        with open(args.filename, "wb") as csv_file:
+            block_counts = generate_world(csv.writer(csv_file, delimiter=","), args, total_blocks, args.density)
 
+    print "Blocks: {}".format(", ".join("{} {}".format(count, color)
+                                        for count, color in zip(block_counts, BLOCK_COLORS)))
     print "Drone world configuration filename: {}".format(args.filename)
     exit(0)
@@ -0,0 +1,291 @@
+import argparse
+import copy
+import json
+import math
+import os
+import random
+import time
+from benchmark import WORLDS_DIR, load_world
+from drone_world.drone_world import DroneWorld
+from drone_world.drone_world_goal import DroneWorldGoal
+from drone_world.search.node import Node
+from generate_random_world import DroneWorldWriter, generate_world
+
+# Number of locations each location query primitive cycles through
+LOCATION_COUNT = 1000
+
+# Fraction of the columns capacity filled by the blocks of a synthetic world
+SYNTHETIC_FILL = 0.25
+
+# Baseline results and per primitive tolerances compared against by default. Per call times
+# depend on the machine, so the baseline is refreshed with --no-baseline --output BASELINE on the
+# machine the comparisons run on, which keeps its tolerances.
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "microbenchmark_baseline.json")
+
+# Allowed relative per call time increase of the primitives without a baseline tolerance
+DEFAULT_TOLERANCE = 0.5
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure the per call cost of the drone world and search primitives.")
+    parser.add_argument("--worlds", type=str, nargs="*", help="World files (default: every world in {})".format(WORLDS_DIR),
+                        required=False)
+    parser.add_argument("--sizes", type=int, nargs="*", help="Block counts of synthetic worlds to add to the sweep",
+                        default=[10, 100, 1000, 10000, 100000, 1000000], required=False)
+    parser.add_argument("--primitives", type=str, nargs="+", help="Primitives to measure",
+                        choices=[name for name, _ in PRIMITIVES], default=[name for name, _ in PRIMITIVES],
+                        required=False)
+    parser.add_argument("--seed", type=int, help="RNG seed of the synthetic worlds and sampled locations", default=0,
+                        required=False)
+    parser.add_argument("--repeat", type=int, help="Timed runs of each primitive, the fastest is kept", default=3,
+                        required=False)
+    parser.add_argument("--min-time", type=float, help="Seconds a timed run lasts at least", default=0.1,
+                        required=False)
+    parser.add_argument("--output", type=str, help="Results filename", default="microbenchmark_results.json",
+                        required=False)
+    parser.add_argument("--baseline", type=str, help="Baseline results filename to compare against", default=BASELINE,
+                        required=False)
+    parser.add_argument("--no-baseline", action="store_true", help="Do not compare against a baseline")
+    parser.add_argument("--tolerance", type=float,
+                        help="Allowed relative per call time increase over the baseline of every primitive (default: "
+                             "the tolerances of the baseline file)", required=False)
+
+    return parser.parse_args()
+
+def synthetic_world(blocks, seed):
+    """Generate a world with blocks randomly stacked blocks.
+     The default world bounds hold about 500,000 blocks, so the x and z bounds grow with the
+     number of blocks to keep the columns filled to SYNTHETIC_FILL of their capacity.
+    """
+    y_max = 50
+    half_size = max(50, int(math.ceil(math.sqrt(blocks / SYNTHETIC_FILL / (y_max - 1)) / 2)))
+    args = argparse.Namespace(red_blocks=blocks - 3 * (blocks // 4), blue_blocks=blocks // 4,
+                              green_blocks=blocks // 4, yellow_blocks=blocks // 4, wall_count=0,
+                              x_min=-half_size, x_max=half_size, y_max=y_max, z_min=-half_size, z_max=half_size,
+                              seed=seed)
+    world = DroneWorld(x_min=-half_size, x_max=half_size, y_max=y_max, z_min=-half_size, z_max=half_size)
+    generate_world(DroneWorldWriter(world), args, blocks)
+    return world
+
+def sample_locations(world, rng):
+    """Get LOCATION_COUNT (x, y, z) locations, half of them held by blocks and half anywhere in the world.
+    """
+    obstacles = world.get_obstacle_locations()
+    locations = []
+    for i in range(LOCATION_COUNT):
+        if obstacles and i % 2:
+            locations.append(obstacles[rng.randrange(len(obstacles))])
+        else:
+            locations.append((rng.randint(world.x_min, world.x_max), rng.randint(world.y_min, world.y_max),
+                              rng.randint(world.z_min, world.z_max)))
+    return locations
+
+def top_block(world):
+    """Get the top block of the column with blocks nearest to the drone, or None if the world has none.
+    """
+    x, _, z = world.get_drone_location()
+    for _, column_x, column_z in world.get_nearest_columns(x, z):
+        return world.get_object(column_x, world.get_column_height(column_x, column_z), column_z)
+    return None
+
+def attach_goal(world):
+    """Get the location above top_block(), like the attach goals of a tower planner, or the drone
+    location if the world has no blocks.
+    """
+    block = top_block(world)
+    if block is None:
+        return world.get_drone_location()
+    return block.x, block.y + 1, block.z
+
+# Each setup takes the world and the sampled locations and returns a function and the number of
+# primitive calls it makes, or None if the primitive cannot be measured on the world. Functions
+# undo their own moves so the world is the same after every call.
+
+def setup_can_move_object(world, locations):
+    can_move_object = world.can_move_object
+
+    def run():
+        for x, y, z in locations:
+            can_move_object(x, y, z)
+    return run, len(locations)
+
+def setup_get_object(world, locations):
+    get_object = world.get_object
+
+    def run():
+        for x, y, z in locations:
+            get_object(x, y, z)
+    return run, len(locations)
+
+def setup_block_drop(world, locations):
+    """Drop of a block already resting on its column, i.e. the cost of finding the drop height.
+    """
+    block = top_block(world)
+    if block is None:
+        return None
+    return block.drop, 1
+
+def setup_drone_actions(world, locations):
+    drone = world.get_object(*world.get_drone_location())
+    return drone.actions, 1
+
+def setup_goal_h(world, locations):
+    """Heuristic of the drone state of the world towards attach_goal().
+    """
+    x, y, z = attach_goal(world)
+    return DroneWorldGoal(x, y, z, world).h, 1
+
+def setup_node_expand(world, locations):
+    """Expansion of the drone state of the world towards attach_goal().
+    """
+    x, y, z = attach_goal(world)
+    return Node(DroneWorldGoal(x, y, z, world), None, None, 0).expand, 1
+
+def _move_up_and_down(drone):
+    def run():
+        if not drone.move(0, 1, 0) or not drone.move(0, -1, 0):
+            raise RuntimeError("Drone cannot move up and down")
+    return run, 2
+
+def setup_drone_move(world, locations):
+    drone = world.get_object(*world.get_drone_location())
+    if not world.can_move_drone(drone.x, drone.y + 1, drone.z):
+        return None
+    return _move_up_and_down(drone)
+
+def setup_drone_move_carrying(world, locations):
+    """Move of a second drone carrying the top block of a column.
+    Note that the drone is left in the world, so this must be the last primitive measured on it.
+    """
+    block = top_block(world)
+    if block is None or block.y + 2 > world.y_max:
+        return None
+    world.add_drone(block.x, block.y + 1, block.z)
+    world.select_drone(world.get_drone_count() - 1)
+    world.attach()
+    return _move_up_and_down(world.get_object(*world.get_drone_location()))
+
+def setup_deepcopy(world, locations):
+    return lambda: copy.deepcopy(world), 1
+
+# Primitives in the order they are measured on each world
+PRIMITIVES = [
+    ("DroneWorld.can_move_object", setup_can_move_object),
+    ("DroneWorld.get_object", setup_get_object),
+    ("Block.drop", setup_block_drop),
+    ("Drone.actions", setup_drone_actions),
+    ("DroneWorldGoal.h", setup_goal_h),
+    ("Node.expand", setup_node_expand),
+    ("Drone.move", setup_drone_move),
+    ("DroneWorld.deepcopy", setup_deepcopy),
+    ("Drone.move (carrying)", setup_drone_move_carrying),
+]
+
+def measure(function, calls, repeat, min_time):
+    """Get the per call time of function in microseconds.
+     Like timeit, the number of runs of function is increased tenfold until a timed run lasts at
+     least min_time seconds, and the fastest of repeat timed runs is kept.
+    """
+    number = 1
+    while True:
+        start_time = time.time()
+        for _ in xrange(number):
+            function()
+        elapsed = time.time() - start_time
+        if elapsed >= min_time:
+            break
+        number *= 10
+    best = elapsed
+    for _ in range(repeat - 1):
+        start_time = time.time()
+        for _ in xrange(number):
+            function()
+        best = min(best, time.time() - start_time)
+    return best / (number * calls) * 1e6
+
+def result_key(result):
+    return result["primitive"], result["world"]
+
+def compare(results, baseline, tolerances):
+    """Return a list of regression descriptions of results against baseline results.
+    tolerances maps primitives to their allowed relative per call time increase. Per call times
+    under a tenth of a microsecond apart are ignored as noise.
+    """
+    baseline_results = dict((result_key(result), result) for result in baseline)
+    regressions = []
+    for result in results:
+        base = baseline_results.get(result_key(result))
+        if not base or base["per_call_us"] is None or result["per_call_us"] is None:
+            continue
+        tolerance = tolerances.get(result["primitive"], DEFAULT_TOLERANCE)
+        if result["per_call_us"] > base["per_call_us"] * (1.0 + tolerance) and \
+                result["per_call_us"] - base["per_call_us"] > 0.1:
+            regressions.append("{} on {}: {:.3f}us > {:.3f}us".format(result["primitive"], result["world"],
+                                                                      result["per_call_us"], base["per_call_us"]))
+    return regressions
+
+def print_curves(results, primitives):
+    """Print the per call time of every primitive across the worlds, in increasing number of blocks.
+    """
+    for primitive in primitives:
+        print primitive
+        curve = sorted((result for result in results if result["primitive"] == primitive),
+                       key=lambda result: result["blocks"])
+        for result in curve:
+            per_call = "-" if result["per_call_us"] is None else "{:.3f}".format(result["per_call_us"])
+            print "    {:<50} {:>8} blocks {:>14} us".format(result["world"], result["blocks"], per_call)
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    worlds = args.worlds
+    if worlds is None:
+        worlds = [os.path.join(WORLDS_DIR, name) for name in sorted(os.listdir(WORLDS_DIR))]
+    worlds = [(os.path.basename(world) if os.path.dirname(world) == WORLDS_DIR else world, world) for world in worlds]
+    worlds += [("synthetic:{}".format(blocks), blocks) for blocks in args.sizes]
+    primitives = [name for name, _ in PRIMITIVES if name in args.primitives]
+
+    # The baseline tolerances are read even without a comparison, so the results keep them
+    baseline = None
+    if args.baseline and (not args.no_baseline or os.path.exists(args.baseline)):
+        with open(args.baseline, "r") as baseline_file:
+            baseline = json.load(baseline_file)
+    tolerances = dict((primitive, DEFAULT_TOLERANCE) for primitive in primitives)
+    if baseline:
+        tolerances.update(baseline.get("tolerances", {}))
+    if args.tolerance is not None:
+        tolerances = dict((primitive, args.tolerance) for primitive in primitives)
+
+    results = []
+    for name, world in worlds:
+        start_time = time.time()
+        if isinstance(world, int):
+            drone_world = synthetic_world(world, args.seed)
+        else:
+            drone_world = load_world(world, args.seed)
+        blocks = len(drone_world.get_obstacle_locations())
+        print "{}: {} blocks, loaded in {:.3f}s".format(name, blocks, time.time() - start_time)
+
+        locations = sample_locations(drone_world, random.Random(args.seed))
+        for primitive, setup in PRIMITIVES:
+            if primitive not in primitives:
+                continue
+            measured = setup(drone_world, locations)
+            per_call = measure(measured[0], measured[1], args.repeat, args.min_time) if measured else None
+            results.append({"primitive": primitive, "world": name, "blocks": blocks, "per_call_us": per_call})
+
+    print_curves(results, primitives)
+
+    with open(args.output, "w") as results_file:
+        json.dump({"created": time.time(), "tolerances": tolerances, "results": results}, results_file, indent=2,
+                  sort_keys=True)
+    print "Microbenchmark results filename: {}".format(args.output)
+
+    if baseline and not args.no_baseline:
+        regressions = compare(results, baseline["results"], tolerances)
+        for regression in regressions:
+            print "Regression: {}".format(regression)
+        if regressions:
+            exit(1)
+        print "No regressions against {}".format(args.baseline)
+
+    exit(0)
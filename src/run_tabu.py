@@ -32,8 +32,7 @@ if __name__ == "__main__":
 
     # From the solution node, get the actions and move the drone
     actions = solution.get_actions()
-    for action in actions:
-        x, y, z = action
-        world.move(x, y, z)
+    if world.execute_plan(actions) is not None:
+        raise RuntimeError("Solution cannot be executed")
 
     exit(0)
\ No newline at end of file
@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+import unittest
+from drone_world.drone_world import DroneWorld
+from drone_world.drone_world_goal import TowerPlannerAStar
+from drone_world.drone_world_object import DroneWorldObjectId
+from drone_world.path_cache import PathCache
+
+def make_world(second_drone=None):
+    """Get a small world with the selected drone at (0, 1, 0), a red block at (4, 0, 0) and a
+    second drone at second_drone if set.
+    """
+    world = DroneWorld(x_min=-5, x_max=5, y_max=5, z_min=-5, z_max=5)
+    world.add_drone(0, 1, 0)
+    world.add_block(4, 0, 0, DroneWorldObjectId.RED)
+    if second_drone:
+        world.add_drone(*second_drone)
+    return world
+
+class PathCacheFileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "paths.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def store_path(self):
+        cache = PathCache(make_world(), filename=self.filename)
+        cache.put((0, 1, 0), (3, 1, 0), False, [(1, 0, 0)] * 3)
+        cache.save()
+
+    def test_stored_path_is_used_for_the_same_world(self):
+        self.store_path()
+        cache = PathCache(make_world(), filename=self.filename)
+        self.assertEqual(cache.get((0, 1, 0), (3, 1, 0), False), [(1, 0, 0)] * 3)
+
+    def test_stored_path_is_not_used_with_a_drone_on_it(self):
+        self.store_path()
+        cache = PathCache(make_world(second_drone=(1, 1, 0)), filename=self.filename)
+        self.assertIsNone(cache.get((0, 1, 0), (3, 1, 0), False))
+
+    def test_planner_avoids_a_drone_on_a_stored_path(self):
+        cache = PathCache(make_world(), filename=self.filename)
+        TowerPlannerAStar(0, 1, 0, cache.world, path_cache=cache).run()
+        cache.save()
+
+        world = make_world(second_drone=(2, 1, 0))
+        TowerPlannerAStar(0, 1, 0, world, path_cache=PathCache(world, filename=self.filename)).run()
+        self.assertEqual(world.get_object(0, 0, 0).id, DroneWorldObjectId.RED)
+
+if __name__ == "__main__":
+    unittest.main()